@@ -0,0 +1,230 @@
+"""Модуль наполнения базы и замеров для бенчмарков API."""
+import csv
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment
+)
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    ShoppingListItem,
+    Tag
+)
+from users.models import Subscription
+
+
+User = get_user_model()
+
+# Размер пачки для bulk_create при наполнении базы.
+SEED_BATCH_SIZE = 2000
+
+# Пароль всех пользователей, созданных для бенчмарка.
+SEED_PASSWORD = 'benchmark-password'
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Создаёт отдельную тестовую базу на время бенчмарка."""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def read_csv_rows(filename):
+    """Возвращает строки csv файла из каталога data."""
+    csv_path = os.path.join(settings.BASE_DIR, 'data', filename)
+    with open(csv_path, encoding='utf-8') as file:
+        return [row for row in csv.reader(file) if row]
+
+
+def seed_dataset(recipes=20000, users=2000, subscriptions=20,
+                 ingredients_per_recipe=8, favorites=30, seed=0):
+    """
+    Наполняет пустую базу реалистичным набором данных.
+
+    Возвращает пользователя, от имени которого выполняются запросы.
+    """
+    rnd = random.Random(seed)
+
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slug) for name, slug in read_csv_rows('tags.csv')]
+    )
+    Ingredient.objects.bulk_create(
+        [
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in read_csv_rows('ingredients.csv')
+        ],
+        batch_size=SEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+    password = make_password(SEED_PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(
+                email=f'user{i}@foodgram.local',
+                username=f'user{i}',
+                first_name=f'Имя{i}',
+                last_name=f'Фамилия{i}',
+                password=password,
+            ) for i in range(users)
+        ],
+        batch_size=SEED_BATCH_SIZE
+    )
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+    Recipe.objects.bulk_create(
+        [
+            Recipe(
+                author_id=rnd.choice(user_ids),
+                name=f'Рецепт {i}',
+                text=f'Описание рецепта {i}. ' * 20,
+                cooking_time=rnd.randint(1, 240),
+                shortcode=f'{i:08x}',
+            ) for i in range(recipes)
+        ],
+        batch_size=SEED_BATCH_SIZE
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+
+    Recipe.tags.through.objects.bulk_create(
+        [
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rnd.sample(tag_ids, rnd.randint(1, len(tag_ids)))
+        ],
+        batch_size=SEED_BATCH_SIZE
+    )
+    RecipeIngredient.objects.bulk_create(
+        [
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rnd.randint(1, 1000)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rnd.sample(
+                ingredient_ids, ingredients_per_recipe
+            )
+        ],
+        batch_size=SEED_BATCH_SIZE
+    )
+
+    Subscription.objects.bulk_create(
+        [
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in rnd.sample(user_ids, subscriptions)
+            if author_id != user_id
+        ],
+        batch_size=SEED_BATCH_SIZE
+    )
+    for model in (Favorite, ShoppingList):
+        model.objects.bulk_create(
+            [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in rnd.sample(recipe_ids, favorites)
+            ],
+            batch_size=SEED_BATCH_SIZE
+        )
+    for start in range(0, len(user_ids), SEED_BATCH_SIZE):
+        ShoppingListItem.objects.rebuild(
+            user_ids[start:start + SEED_BATCH_SIZE]
+        )
+    Recipe.objects.reconcile_counters()
+    User.objects.reconcile_counters()
+    return get_benchmark_user()
+
+
+def get_benchmark_user():
+    """
+    Возвращает пользователя с наибольшим числом подписок, при равенстве —
+    с меньшим id.
+    """
+    return User.objects.annotate(
+        subscriptions_total=Count('subscriptions')
+    ).order_by('-subscriptions_total', 'id').first()
+
+
+def get_client(user=None):
+    """Возвращает тестовый клиент, авторизованный токеном пользователя."""
+    client = Client()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+    return client
+
+
+def percentile(values, percent):
+    """Возвращает перцентиль отсортированного списка значений."""
+    if not values:
+        return 0.0
+    index = round((len(values) - 1) * percent / 100)
+    return values[index]
+
+
+def response_size(response):
+    """Возвращает размер тела ответа в байтах."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, method, url, iterations=20, warmup=2, **kwargs):
+    """
+    Замеряет запрос к API.
+
+    Возвращает словарь с кодом ответа, количеством запросов к базе,
+    перцентилями задержки в миллисекундах и размером ответа.
+    """
+    request = getattr(client, method)
+    for _ in range(warmup):
+        response_size(request(url, **kwargs))
+
+    with CaptureQueriesContext(connection) as context:
+        response = request(url, **kwargs)
+        size = response_size(response)
+    queries = len(context.captured_queries)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response_size(request(url, **kwargs))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    return {
+        'status': response.status_code,
+        'queries': queries,
+        'p50': round(percentile(timings, 50), 2),
+        'p95': round(percentile(timings, 95), 2),
+        'p99': round(percentile(timings, 99), 2),
+        'size': size,
+    }
@@ -0,0 +1,92 @@
+"""Модуль кэширования справочников тегов и ингредиентов."""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import ReferenceVersion
+
+
+def get_reference_cache():
+    """Возвращает кэш для справочников."""
+    return caches[settings.REFERENCE_CACHE_ALIAS]
+
+
+def get_reference_version(prefix):
+    """Возвращает текущую версию справочника."""
+    return ReferenceVersion.objects.get_version(prefix)
+
+
+def get_reference_value(prefix, name, compute):
+    """
+    Возвращает значение, вычисленное по справочнику, из кэша.
+
+    Значение хранится с версией справочника в ключе и пересчитывается
+    функцией compute после его изменения.
+    """
+    cache = get_reference_cache()
+    key = f'reference:{prefix}:{get_reference_version(prefix)}:{name}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.REFERENCE_CACHE_TIMEOUT)
+    return value
+
+
+def invalidate_reference(prefix):
+    """Меняет версию справочника, сбрасывая все его закэшированные ответы."""
+    ReferenceVersion.objects.bump(prefix)
+
+
+class ReferenceCacheMixin:
+    """
+    Кэширует готовые JSON-ответы справочника.
+
+    Ответы хранятся в кэше REFERENCE_CACHE_ALIAS с версией справочника в
+    ключе, поэтому смена версии сразу делает старые записи недоступными.
+    Для браузеров и nginx выставляются ETag и Cache-Control.
+    """
+
+    cache_prefix = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def cached_response(self, request, view, *args, **kwargs):
+        """Отдаёт ответ из кэша или формирует и сохраняет его."""
+        if request.accepted_renderer.format != 'json':
+            return view(request, *args, **kwargs)
+
+        cache = get_reference_cache()
+        key = (
+            f'reference:{self.cache_prefix}:'
+            f'{get_reference_version(self.cache_prefix)}:'
+            f'{request.get_full_path()}'
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = JSONRenderer().render(response.data)
+            cached = (quote_etag(hashlib.md5(content).hexdigest()), content)
+            cache.set(key, cached, settings.REFERENCE_CACHE_TIMEOUT)
+
+        etag, content = cached
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=settings.REFERENCE_CACHE_MAX_AGE
+        )
+        return response
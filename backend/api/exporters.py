@@ -0,0 +1,127 @@
+"""Модуль выгрузки списка покупок в разных форматах."""
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+
+
+class ShoppingListExporter:
+    """Базовый класс выгрузки списка покупок."""
+
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+    streaming = True
+
+    def render(self, ingredients):
+        """Возвращает генератор частей файла."""
+        yield 'Список покупок:\n\n'
+        for ingredient in ingredients:
+            yield (
+                f'• {ingredient["ingredient__name"]} - '
+                f'{ingredient["total_amount"]} '
+                f'{ingredient["ingredient__measurement_unit"]}\n'
+            )
+
+
+class Echo:
+    """Буфер, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class CsvShoppingListExporter(ShoppingListExporter):
+    """Выгрузка списка покупок в csv."""
+
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def render(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('Название', 'Количество', 'Единица измерения'))
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['total_amount'],
+                ingredient['ingredient__measurement_unit'],
+            ))
+
+
+class JsonShoppingListExporter(ShoppingListExporter):
+    """Выгрузка списка покупок в json."""
+
+    content_type = 'application/json; charset=utf-8'
+    extension = 'json'
+
+    def render(self, ingredients):
+        separator = ''
+        yield '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(
+                {
+                    'name': ingredient['ingredient__name'],
+                    'amount': ingredient['total_amount'],
+                    'measurement_unit':
+                        ingredient['ingredient__measurement_unit'],
+                },
+                ensure_ascii=False
+            )
+            separator = ','
+        yield ']'
+
+
+class PdfShoppingListExporter(ShoppingListExporter):
+    """
+    Выгрузка списка покупок в pdf.
+
+    Документ собирается целиком в памяти, поэтому отдаётся не потоком.
+    """
+
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    streaming = False
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+
+    def get_font(self):
+        """Регистрирует шрифт с поддержкой кириллицы, если он доступен."""
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        font_path = settings.SHOPPING_LIST_PDF_FONT
+        if not os.path.exists(font_path):
+            return 'Helvetica'
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(self.font_name, font_path))
+        return self.font_name
+
+    def render(self, ingredients):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        font = self.get_font()
+        _, height = A4
+        line_height = self.font_size * 1.5
+        y = height - self.margin
+        for line in super().render(ingredients):
+            if y < self.margin:
+                pdf.showPage()
+                y = height - self.margin
+            pdf.setFont(font, self.font_size)
+            pdf.drawString(self.margin, y, line.rstrip('\n'))
+            y -= line_height
+        pdf.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_LIST_EXPORTERS = {
+    'txt': ShoppingListExporter,
+    'csv': CsvShoppingListExporter,
+    'json': JsonShoppingListExporter,
+    'pdf': PdfShoppingListExporter,
+}
@@ -1,18 +1,76 @@
 """Модуль фильтров."""
+from django.db.models import (
+    Exists,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef
+)
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe
+from .cache import get_reference_value
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.managers import count_subquery
 
 
 class IngredientFilter(filters.FilterSet):
     """Фильтр для модели Ingredient по названию ингредиента."""
 
-    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
 
+    def filter_name(self, queryset, name, value):
+        """Ищет по названию, начало названия в приоритете."""
+        return queryset.search(value)
+
+
+# Варианты сортировки рецептов: поля ключа сортировки по убыванию.
+RECIPE_ORDERINGS = {
+    'newest': ('created_at', 'id'),
+    'popular': ('favorites_count', 'id'),
+    'trending': ('trending_score', 'id'),
+}
+
+
+# Параметры, задающие собственный порядок выдачи, в порядке приоритета,
+# и поля ключа сортировки для каждого из них.
+RANKED_FILTERS = {
+    'ingredients': ('coverage_rank', 'id'),
+    'search': ('search_rank', 'id'),
+}
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Фильтр по списку чисел через запятую."""
+
+
+# Режимы фильтра по тегам: хотя бы один из тегов или все теги сразу.
+TAG_MATCH_MODES = ('any', 'all')
+
+
+def get_tag_ids():
+    """Возвращает {slug: id} всех тегов из кэша справочника тегов."""
+    return get_reference_value(
+        'tags', 'ids', lambda: dict(Tag.objects.values_list('slug', 'id'))
+    )
+
+
+def get_recipe_keyset(request):
+    """
+    Возвращает поля сортировки рецептов из параметра ordering.
+
+    Подборка по ингредиентам и поиск сортируются по своему рангу.
+    """
+    for param, keyset in RANKED_FILTERS.items():
+        if request.query_params.get(param):
+            return keyset
+    return RECIPE_ORDERINGS.get(
+        request.query_params.get('ordering'), RECIPE_ORDERINGS['newest']
+    )
+
 
 class RecipeFilter(filters.FilterSet):
     """Фильтр для модели Recipe."""
@@ -21,8 +79,127 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         field_name='is_in_shopping_cart'
     )
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(choices=[], method='filter_tags')
+    tags_mode = filters.ChoiceFilter(
+        choices=[(mode, mode) for mode in TAG_MATCH_MODES],
+        method='filter_tags_mode'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='filter_ordering'
+    )
+    ingredients = NumberInFilter(method='filter_ingredients')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'is_in_shopping_cart', 'author', 'tags']
+        fields = [
+            'is_favorited', 'is_in_shopping_cart', 'author', 'tags',
+            'tags_mode', 'ordering', 'ingredients', 'search'
+        ]
+
+    def __init__(self, *args, **kwargs):
+        """
+        Читает теги из кэша один раз на запрос: тот же словарь задаёт
+        варианты фильтра и используется в filter_tags.
+        """
+        super().__init__(*args, **kwargs)
+        self.tag_ids = get_tag_ids()
+        self.filters['tags'].extra['choices'] = [
+            (slug, slug) for slug in self.tag_ids
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Оставляет рецепты с хотя бы одним из тегов или, при
+        tags_mode=all, со всеми тегами.
+
+        Условие строится как EXISTS по таблице связи с id тегов из
+        кэша, поэтому рецепт с несколькими подходящими тегами не
+        дублируется в выдаче, а таблица тегов не участвует в запросе.
+        """
+        tag_ids = self.tag_ids
+        links = Recipe.tags.through.objects.filter(recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            for slug in value:
+                queryset = queryset.filter(
+                    Exists(links.filter(tag_id=tag_ids.get(slug)))
+                )
+            return queryset
+        return queryset.filter(Exists(links.filter(
+            tag_id__in=[tag_ids.get(slug) for slug in value]
+        )))
+
+    def filter_tags_mode(self, queryset, name, value):
+        """Режим учитывается в filter_tags."""
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        """
+        Сортирует рецепты по новизне, числу добавлений в избранное или
+        рейтингу trending. Для каждого варианта есть индекс.
+        """
+        if self.get_ranking() is not None:
+            return queryset
+        return queryset.order_by(
+            *(f'-{field}' for field in RECIPE_ORDERINGS[value])
+        )
+
+    def get_ranking(self):
+        """Возвращает параметр, по рангу которого сортируется выдача."""
+        for param in RANKED_FILTERS:
+            if self.form.cleaned_data.get(param):
+                return param
+        return None
+
+    def order_by_rank(self, queryset, name):
+        """Сортирует по рангу фильтра name, если он главный в запросе."""
+        if self.get_ranking() != name:
+            return queryset
+        return queryset.order_by(
+            *(f'-{field}' for field in RANKED_FILTERS[name])
+        )
+
+    def filter_ingredients(self, queryset, name, value):
+        """
+        Оставляет рецепты, в которых есть хотя бы один из ингредиентов,
+        и сортирует их по полноте совпадения.
+
+        Первыми идут рецепты, где не хватает меньше ингредиентов, при
+        равенстве — где совпало больше, затем более новые. Ранг
+        coverage_rank считается в запросе по уже отфильтрованным
+        рецептам, поэтому другие фильтры не обрезают выдачу.
+
+        Подходящие рецепты берутся по индексу ingredient_id таблицы
+        связей, совпавшие ингредиенты считаются по индексу (recipe,
+        ingredient) только для них, а общее число ингредиентов хранится
+        в рецепте.
+        """
+        ingredient_ids = {int(pk) for pk in value}
+        links = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        )
+        matched = count_subquery(links, 'recipe')
+        total = F('ingredients_count')
+        # Совпавших не больше weight - 1, поэтому каждый недостающий
+        # ингредиент весит больше любого числа совпавших.
+        weight = len(ingredient_ids) + 1
+        return self.order_by_rank(
+            queryset.filter(
+                pk__in=links.values('recipe_id')
+            ).annotate(
+                coverage_rank=ExpressionWrapper(
+                    matched * (weight + 1) - total * weight,
+                    output_field=IntegerField()
+                )
+            ),
+            name
+        )
+
+    def filter_search(self, queryset, name, value):
+        """
+        Ищет рецепты по названию и описанию и сортирует по релевантности.
+
+        Каждый рецепт получает фрагмент описания search_snippet.
+        """
+        return self.order_by_rank(queryset.search(value), name)
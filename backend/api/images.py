@@ -0,0 +1,160 @@
+"""Модуль фоновой подготовки уменьшенных копий изображений."""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+# Задачи, которые уже стоят в очереди или выполняются в этом процессе.
+_in_progress = set()
+_in_progress_lock = threading.Lock()
+
+
+def get_executor():
+    """Возвращает пул потоков для обработки изображений."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-variants'
+        )
+    return _executor
+
+
+def get_variant_format():
+    """Возвращает формат и расширение для уменьшенных копий."""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def render_variants(source_name):
+    """
+    Создаёт уменьшенные копии изображения из хранилища.
+
+    Имена копий выводятся из имени исходника, поэтому повторная обработка
+    перезаписывает те же файлы. Возвращает словарь
+    {название копии: имя файла в хранилище}.
+    """
+    image_format, extension = get_variant_format()
+    directory, filename = os.path.split(source_name)
+    filename = filename.replace('.', '_')
+
+    with default_storage.open(source_name, 'rb') as file:
+        with Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGB')
+
+            variants = {}
+            for variant, size in settings.IMAGE_VARIANTS.items():
+                resized = image.copy()
+                resized.thumbnail(size, Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(
+                    buffer,
+                    image_format,
+                    quality=settings.IMAGE_VARIANT_QUALITY
+                )
+                name = os.path.join(
+                    directory, 'variants', f'{filename}_{variant}.{extension}'
+                )
+                default_storage.delete(name)
+                variants[variant] = default_storage.save(
+                    name, ContentFile(buffer.getvalue())
+                )
+    return variants
+
+
+def delete_variants(variants, keep=()):
+    """Удаляет файлы уменьшенных копий из хранилища."""
+    for variant, name in variants.items():
+        if variant != 'source' and name not in keep:
+            default_storage.delete(name)
+
+
+def process_image(model, pk, image_field, variants_field, source_name):
+    """Готовит копии и сохраняет их имена, если исходник не сменился."""
+    try:
+        queryset = model.objects.filter(pk=pk, **{image_field: source_name})
+        previous = queryset.values_list(variants_field, flat=True).first()
+        if previous is None or previous.get('source') == source_name:
+            return
+        variants = render_variants(source_name)
+        variants['source'] = source_name
+        if queryset.update(**{variants_field: variants}):
+            delete_variants(previous, keep=variants.values())
+        else:
+            delete_variants(variants)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', source_name)
+    finally:
+        with _in_progress_lock:
+            _in_progress.discard((model, pk, source_name))
+        close_old_connections()
+
+
+def submit_image_task(model, pk, image_field, variants_field, source_name):
+    """Отправляет задачу в пул, если такая же ещё не выполняется."""
+    key = (model, pk, source_name)
+    with _in_progress_lock:
+        if key in _in_progress:
+            return
+        _in_progress.add(key)
+    task = (model, pk, image_field, variants_field, source_name)
+    if settings.IMAGE_PROCESSING_SYNC:
+        process_image(*task)
+    else:
+        get_executor().submit(process_image, *task)
+
+
+def schedule_image_variants(instance, image_field, variants_field):
+    """
+    Ставит в очередь подготовку копий после фиксации транзакции.
+
+    Запрос не ждёт обработки: пока копии не готовы, клиенты получают
+    ссылку на исходное изображение.
+    """
+    image = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    if not image:
+        if variants:
+            type(instance).objects.filter(pk=instance.pk).update(
+                **{variants_field: {}}
+            )
+            delete_variants(variants)
+        return
+    if variants.get('source') == image.name:
+        return
+
+    task = (
+        type(instance), instance.pk, image_field, variants_field, image.name
+    )
+    transaction.on_commit(lambda: submit_image_task(*task))
+
+
+def get_variant_urls(instance, image_field, variants_field, request=None):
+    """Возвращает ссылки на копии, или на исходник, если копий ещё нет."""
+    image = getattr(instance, image_field)
+    if not image:
+        return None
+    variants = getattr(instance, variants_field) or {}
+    if variants.get('source') != image.name:
+        variants = {}
+    urls = {}
+    for variant in settings.IMAGE_VARIANTS:
+        url = (default_storage.url(variants[variant]) if variant in variants
+               else image.url)
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
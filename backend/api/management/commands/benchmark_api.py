@@ -0,0 +1,212 @@
+"""Модуль бенчмарка количества запросов и задержки эндпоинтов API."""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from api.benchmark import (
+    benchmark_database,
+    get_benchmark_user,
+    get_client,
+    measure,
+    seed_dataset
+)
+from recipes.models import Ingredient, Recipe, Tag
+
+
+# Дополнительные query-параметры для маршрутов, зависящих от фильтров.
+SCENARIOS = {
+    'recipes-list': [
+        '',
+        '?limit=100',
+        '?is_favorited=1',
+        '?is_in_shopping_cart=1',
+        '?tags=breakfast&tags=lunch',
+        '?cursor=&limit=100',
+        '?ordering=popular',
+        '?ordering=trending',
+        '?ordering=trending&cursor=&limit=100',
+    ],
+    'recipes-download-shopping-list': [
+        '',
+        '?file_format=csv',
+        '?file_format=json',
+        '?file_format=pdf',
+    ],
+    'ingredients-list': ['', '?name=са'],
+    'users-list': ['', '?limit=100'],
+    'users-subscriptions': [
+        '',
+        '?recipes_limit=3',
+        '?limit=50',
+        '?cursor=&limit=50',
+    ],
+}
+
+# Префиксы, маршруты которых участвуют в бенчмарке.
+ROUTE_PREFIXES = ('api/', 's/')
+
+
+def iter_patterns(patterns, prefix=''):
+    """Обходит дерево маршрутов и возвращает пары (префикс, маршрут)."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_patterns(
+                pattern.url_patterns, prefix + str(pattern.pattern)
+            )
+        elif isinstance(pattern, URLPattern):
+            yield prefix, pattern
+
+
+def supports_get(pattern):
+    """Проверяет, обрабатывает ли маршрут GET-запросы."""
+    callback = pattern.callback
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        return 'get' in actions
+    view_class = getattr(callback, 'view_class', None)
+    if view_class is not None:
+        return ('get' in view_class.http_method_names
+                and hasattr(view_class, 'get'))
+    return True
+
+
+class Command(BaseCommand):
+    help = ('Бенчмарк эндпоинтов API: количество запросов к базе, '
+            'перцентили задержки и размер ответа.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(
+                settings.BASE_DIR, 'data', 'benchmark_baseline.json'
+            ),
+            help='Путь к файлу с сохранёнными результатами.'
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Сохранить результаты как новый baseline.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый рост p95 относительно baseline (доля).'
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--subscriptions', type=int, default=20)
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Не удалять тестовую базу, чтобы не наполнять её заново.'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['keepdb']):
+            results = self.run_benchmark(options)
+        self.report(results, options)
+
+    def run_benchmark(self, options):
+        """Наполняет базу при необходимости и замеряет все маршруты."""
+        if Recipe.objects.exists():
+            user = get_benchmark_user()
+        else:
+            self.stdout.write('Наполнение базы данными...')
+            user = seed_dataset(
+                recipes=options['recipes'],
+                users=options['users'],
+                subscriptions=options['subscriptions'],
+            )
+        client = get_client(user)
+        kwargs_values = self.get_kwargs_values(user)
+
+        results = {}
+        for prefix, pattern in iter_patterns(get_resolver().url_patterns):
+            if not prefix.startswith(ROUTE_PREFIXES) or not pattern.name:
+                continue
+            groups = set(pattern.pattern.regex.groupindex)
+            if 'format' in groups:
+                continue
+            if not supports_get(pattern):
+                self.stdout.write(f'Пропущен {pattern.name}: нет GET.')
+                continue
+            basename = pattern.name.split('-')[0]
+            url = reverse(pattern.name, kwargs={
+                group: kwargs_values.get((basename, group),
+                                         kwargs_values.get(group))
+                for group in groups
+            })
+            for query in SCENARIOS.get(pattern.name, ['']):
+                results[f'{pattern.name} {query}'.strip()] = measure(
+                    client,
+                    'get',
+                    url + query,
+                    iterations=options['iterations'],
+                )
+        return results
+
+    def get_kwargs_values(self, user):
+        """Возвращает значения параметров маршрутов для подстановки."""
+        recipe = Recipe.objects.order_by('id').first()
+        return {
+            ('recipes', 'pk'): recipe.pk,
+            ('ingredients', 'pk'): Ingredient.objects.first().pk,
+            ('tags', 'pk'): Tag.objects.first().pk,
+            'id': user.pk,
+            'short_code': recipe.shortcode,
+        }
+
+    def report(self, results, options):
+        """Печатает результаты и сравнивает их с baseline."""
+        self.stdout.write(
+            f'{"маршрут":<50} {"код":>4} {"запр.":>6} '
+            f'{"p50":>8} {"p95":>8} {"p99":>8} {"байт":>9}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<50} {result["status"]:>4} {result["queries"]:>6} '
+                f'{result["p50"]:>8} {result["p95"]:>8} {result["p99"]:>8} '
+                f'{result["size"]:>9}'
+            )
+
+        baseline_path = options['baseline']
+        if options['update_baseline']:
+            with open(baseline_path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f'Baseline сохранён в {baseline_path}.')
+            )
+            return
+        if not os.path.exists(baseline_path):
+            self.stdout.write(
+                self.style.WARNING('Baseline не найден, сравнение пропущено.')
+            )
+            return
+
+        with open(baseline_path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'> {expected["queries"]}'
+                )
+            limit = expected['p95'] * (1 + options['tolerance'])
+            if result['p95'] > limit:
+                regressions.append(
+                    f'{name}: p95 {result["p95"]} мс > {limit:.2f} мс'
+                )
+        if regressions:
+            raise CommandError(
+                'Обнаружены регрессии:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено.'))
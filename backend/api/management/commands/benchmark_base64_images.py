@@ -0,0 +1,87 @@
+"""Модуль бенчмарка памяти при декодировании изображений base64."""
+import base64
+import io
+import os
+import time
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from api.serializers import AvatarUpdateSerializer, RecipeCreateSerializer
+
+
+def make_data_url(size):
+    """Возвращает data URL PNG-изображения примерно заданного размера."""
+    side = max(int((size / 3) ** 0.5), 1)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', compress_level=0)
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def legacy_decode(data):
+    """Прежний способ: split и декодирование строки целиком."""
+    format, imgstr = data.split(';base64,')
+    ext = format.split('/')[-1]
+    return ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+
+
+def measure_peak(function, data):
+    """Возвращает пиковое потребление памяти (байт) и время (мс)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(data)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if hasattr(result, 'close'):
+        result.close()
+    return peak, elapsed
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пиковое потребление памяти при декодировании '
+            'изображений рецептов и аватаров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[256 * 1024, 2 * 1024 * 1024, 7 * 1024 * 1024],
+            help='Размеры изображений в байтах.'
+        )
+
+    def handle(self, *args, **options):
+        fields = {
+            'recipe': RecipeCreateSerializer().fields['image'],
+            'avatar': AvatarUpdateSerializer().fields['avatar'],
+        }
+        self.stdout.write(
+            f'{"поле":<8} {"размер":>10} {"способ":<10} '
+            f'{"пик, КБ":>10} {"мс":>8}'
+        )
+        for size in options['sizes']:
+            data = make_data_url(size)
+            for name, field in fields.items():
+                methods = {
+                    'legacy': legacy_decode,
+                    'streaming': field.decode,
+                }
+                for method, function in methods.items():
+                    try:
+                        peak, elapsed = measure_peak(function, data)
+                    except Exception as error:
+                        tracemalloc.stop()
+                        self.stdout.write(
+                            f'{name:<8} {size:>10} {method:<10} '
+                            f'отклонено: {error}'
+                        )
+                        continue
+                    self.stdout.write(
+                        f'{name:<8} {size:>10} {method:<10} '
+                        f'{peak // 1024:>10} {elapsed:>8.1f}'
+                    )
@@ -0,0 +1,83 @@
+"""Модуль бенчмарка подборки рецептов по ингредиентам."""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from api.benchmark import (
+    benchmark_database,
+    get_benchmark_user,
+    get_client,
+    measure,
+    seed_dataset
+)
+from recipes.models import Recipe, RecipeIngredient
+
+
+# Количество ингредиентов в запросе подборки.
+INGREDIENT_SET_SIZES = (1, 3, 10, 20)
+
+# Дополнительные фильтры, сужающие выдачу до сортировки по рангу.
+EXTRA_FILTERS = ('', '&tags=breakfast', '&is_favorited=1')
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк подборки рецептов по ингредиентам: ранг coverage_rank '
+        'считается в SQL по отфильтрованным рецептам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['keepdb']):
+            if Recipe.objects.exists():
+                user = get_benchmark_user()
+            else:
+                self.stdout.write('Наполнение базы данными...')
+                user = seed_dataset(
+                    recipes=options['recipes'], users=options['users']
+                )
+            self.stdout.write(
+                f'Рецептов: {Recipe.objects.count()}, связей с '
+                f'ингредиентами: {RecipeIngredient.objects.count()}'
+            )
+            self.stdout.write(
+                f'{"запрос":<40} {"рецептов":>9} {"запр.":>6} '
+                f'{"p50":>8} {"p95":>8} {"p99":>8}'
+            )
+            client = get_client(user)
+            for size in INGREDIENT_SET_SIZES:
+                ingredient_ids = self.get_popular_ingredients(size)
+                for extra in EXTRA_FILTERS:
+                    self.run_scenario(
+                        client, ingredient_ids, extra, options['iterations']
+                    )
+
+    def get_popular_ingredients(self, count):
+        """
+        Возвращает id самых частых ингредиентов: с ними под фильтр
+        попадает больше всего рецептов, и ранг считается для каждого.
+        """
+        return list(RecipeIngredient.objects.values('ingredient').annotate(
+            recipes_count=Count('*')
+        ).order_by('-recipes_count', 'ingredient').values_list(
+            'ingredient', flat=True
+        )[:count])
+
+    def run_scenario(self, client, ingredient_ids, extra, iterations):
+        """Замеряет один запрос подборки и выводит строку отчёта."""
+        query = f'?ingredients={",".join(map(str, ingredient_ids))}{extra}'
+        matched = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('recipe').distinct().count()
+        result = measure(
+            client, 'get', f'/api/recipes/{query}', iterations=iterations
+        )
+        label = f'{len(ingredient_ids)} ингр.{extra}'
+        self.stdout.write(
+            f'{label:<40} {matched:>9} {result["queries"]:>6} '
+            f'{result["p50"]:>8} {result["p95"]:>8} {result["p99"]:>8}'
+        )
@@ -0,0 +1,109 @@
+"""Модуль бенчмарка ленты рецептов по подпискам."""
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.benchmark import (
+    SEED_BATCH_SIZE,
+    benchmark_database,
+    get_client,
+    measure,
+    seed_dataset
+)
+from users.models import Subscription
+
+
+User = get_user_model()
+
+# Сколько страниц пролистывается перед замером глубокой страницы.
+DEEP_PAGE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк ленты /api/recipes/feed/ для пользователей с разным '
+        'количеством подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=50000)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 4000],
+            help='Количество подписок у замеряемых пользователей.'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['keepdb']):
+            if not User.objects.exists():
+                self.stdout.write('Наполнение базы данными...')
+                seed_dataset(
+                    recipes=options['recipes'],
+                    users=options['users'],
+                    subscriptions=0,
+                    favorites=0
+                )
+            readers = self.prepare_readers(options['follows'])
+            self.stdout.write(
+                f'{"подписок":>9} {"страница":<9} {"запр.":>6} '
+                f'{"p50":>8} {"p95":>8} {"p99":>8}'
+            )
+            for follows, reader in readers.items():
+                client = get_client(reader)
+                url = f'/api/recipes/feed/?limit={options["limit"]}'
+                pages = {'первая': url, 'глубокая': self.deep_url(client, url)}
+                for page, page_url in pages.items():
+                    if page_url is None:
+                        continue
+                    result = measure(
+                        client, 'get', page_url,
+                        iterations=options['iterations']
+                    )
+                    self.stdout.write(
+                        f'{follows:>9} {page:<9} {result["queries"]:>6} '
+                        f'{result["p50"]:>8} {result["p95"]:>8} '
+                        f'{result["p99"]:>8}'
+                    )
+
+    def prepare_readers(self, follows):
+        """
+        Возвращает пользователей с заданным количеством подписок.
+
+        Подписки читателей создаются заново, чтобы их количество точно
+        соответствовало параметру --follows.
+        """
+        rnd = random.Random(0)
+        user_ids = list(User.objects.order_by('id').values_list(
+            'id', flat=True
+        ))
+        readers = {}
+        for index, count in enumerate(follows):
+            reader_id = user_ids[index]
+            authors = [pk for pk in user_ids if pk != reader_id]
+            Subscription.objects.filter(user_id=reader_id).delete()
+            Subscription.objects.bulk_create(
+                [
+                    Subscription(user_id=reader_id, author_id=author_id)
+                    for author_id in rnd.sample(
+                        authors, min(count, len(authors))
+                    )
+                ],
+                batch_size=SEED_BATCH_SIZE
+            )
+            readers[count] = User.objects.get(pk=reader_id)
+        return readers
+
+    def deep_url(self, client, url):
+        """Пролистывает ленту на DEEP_PAGE страниц вперёд."""
+        for _ in range(DEEP_PAGE):
+            url = client.get(url).json()['next']
+            if url is None:
+                return None
+        return url
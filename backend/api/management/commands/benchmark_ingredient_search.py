@@ -0,0 +1,63 @@
+"""Модуль бенчмарка поиска ингредиентов по названию."""
+from django.core.management.base import BaseCommand
+
+from api.benchmark import (
+    SEED_BATCH_SIZE,
+    benchmark_database,
+    get_client,
+    measure,
+    read_csv_rows
+)
+from recipes.models import Ingredient
+
+
+# Строки, которые пользователь вводит в автодополнение.
+SEARCH_QUERIES = ('с', 'са', 'сах', 'мука', 'масло сл', 'ка', 'zzz')
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк поиска ингредиентов на большом справочнике.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=100000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        with benchmark_database(options['keepdb']):
+            if not Ingredient.objects.exists():
+                self.stdout.write('Наполнение базы данными...')
+                self.seed_ingredients(options['ingredients'])
+            total = Ingredient.objects.count()
+            client = get_client()
+            self.stdout.write(f'Ингредиентов в базе: {total}')
+            self.stdout.write(
+                f'{"запрос":<12} {"запр.":>6} {"p50":>8} '
+                f'{"p95":>8} {"p99":>8} {"байт":>9}'
+            )
+            for query in SEARCH_QUERIES:
+                result = measure(
+                    client,
+                    'get',
+                    '/api/ingredients/',
+                    iterations=options['iterations'],
+                    data={'name': query},
+                )
+                self.stdout.write(
+                    f'{query:<12} {result["queries"]:>6} '
+                    f'{result["p50"]:>8} {result["p95"]:>8} '
+                    f'{result["p99"]:>8} {result["size"]:>9}'
+                )
+
+    def seed_ingredients(self, count):
+        """Размножает справочник из ingredients.csv до нужного размера."""
+        rows = read_csv_rows('ingredients.csv')
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(
+                    name=f'{rows[i % len(rows)][0]} {i // len(rows)}',
+                    measurement_unit=rows[i % len(rows)][1]
+                ) for i in range(count)
+            ],
+            batch_size=SEED_BATCH_SIZE
+        )
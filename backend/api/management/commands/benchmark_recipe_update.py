@@ -0,0 +1,140 @@
+"""Модуль бенчмарка обновления рецепта с большим числом ингредиентов."""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmark import (
+    benchmark_database,
+    get_benchmark_user,
+    get_client,
+    percentile,
+    seed_dataset
+)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк PATCH /api/recipes/{id}/ для рецепта с большим числом '
+        'ингредиентов при разном объёме изменений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=60)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        count = options['ingredients']
+        with benchmark_database(options['keepdb']):
+            if not Ingredient.objects.exists():
+                self.stdout.write('Наполнение базы данными...')
+                seed_dataset(recipes=0, users=10, subscriptions=0,
+                             favorites=0)
+            ingredient_ids = list(Ingredient.objects.order_by(
+                'id'
+            ).values_list('id', flat=True)[:count * 2])
+            if len(ingredient_ids) < count * 2:
+                raise CommandError(
+                    f'Нужно хотя бы {count * 2} ингредиентов в справочнике.'
+                )
+            client, recipe = self.prepare_recipe(ingredient_ids[:count])
+            url = f'/api/recipes/{recipe.pk}/'
+            self.stdout.write(f'Ингредиентов в рецепте: {count}')
+            self.stdout.write(
+                f'{"изменение":<18} {"запр.":>6} {"p50":>8} '
+                f'{"p95":>8} {"p99":>8}'
+            )
+            for title, payloads in self.get_scenarios(
+                ingredient_ids, count
+            ).items():
+                result = self.measure(
+                    client, url, payloads, options['iterations']
+                )
+                self.stdout.write(
+                    f'{title:<18} {result["queries"]:>6} '
+                    f'{result["p50"]:>8} {result["p95"]:>8} '
+                    f'{result["p99"]:>8}'
+                )
+
+    def prepare_recipe(self, ingredient_ids):
+        """Создаёт рецепт с ингредиентами, возвращает клиент автора."""
+        recipe = Recipe.objects.create(
+            author=get_benchmark_user(),
+            name='Рецепт для бенчмарка',
+            text='Описание рецепта.',
+            cooking_time=10,
+            ingredients_count=len(ingredient_ids)
+        )
+        recipe.tags.set(Tag.objects.all()[:1])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient_id=pk, amount=1)
+            for pk in ingredient_ids
+        ])
+        return get_client(recipe.author), recipe
+
+    def get_scenarios(self, ingredient_ids, count):
+        """
+        Возвращает пары тел запроса для каждого сценария.
+
+        Запросы чередуют тела пары, поэтому каждый из них действительно
+        меняет рецепт, кроме сценария без изменений.
+        """
+        tags = list(Tag.objects.values_list('id', flat=True)[:1])
+
+        def payload(ids, amounts=None):
+            amounts = amounts or {}
+            return json.dumps({
+                'name': 'Рецепт для бенчмарка',
+                'text': 'Описание рецепта.',
+                'cooking_time': 10,
+                'tags': tags,
+                'ingredients': [
+                    {'id': pk, 'amount': amounts.get(pk, 1)} for pk in ids
+                ],
+            })
+
+        base = ingredient_ids[:count]
+        return {
+            'без изменений': (payload(base), payload(base)),
+            'одно количество': (payload(base), payload(base, {base[0]: 2})),
+            'один ингредиент': (
+                payload(base), payload(base[:-1] + [ingredient_ids[count]])
+            ),
+            'все ингредиенты': (
+                payload(base), payload(ingredient_ids[count:count * 2])
+            ),
+        }
+
+    def measure(self, client, url, payloads, iterations):
+        """Замеряет PATCH, по очереди отправляя тела из пары."""
+        for body in payloads:
+            self.patch(client, url, body)
+
+        with CaptureQueriesContext(connection) as context:
+            self.patch(client, url, payloads[0])
+        queries = len(context.captured_queries)
+
+        timings = []
+        for number in range(iterations):
+            start = time.perf_counter()
+            self.patch(client, url, payloads[(number + 1) % 2])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return {
+            'queries': queries,
+            'p50': round(percentile(timings, 50), 2),
+            'p95': round(percentile(timings, 95), 2),
+            'p99': round(percentile(timings, 99), 2),
+        }
+
+    def patch(self, client, url, body):
+        """Отправляет PATCH и проверяет ответ."""
+        response = client.patch(url, body, content_type='application/json')
+        if response.status_code != 200:
+            raise CommandError(
+                f'PATCH {url}: {response.status_code} {response.content}'
+            )
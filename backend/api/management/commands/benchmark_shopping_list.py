@@ -0,0 +1,126 @@
+"""Модуль бенчмарка сводного списка покупок с разными единицами."""
+import json
+import random
+
+from django.core.management.base import BaseCommand
+
+from api.benchmark import (
+    SEED_BATCH_SIZE,
+    benchmark_database,
+    get_benchmark_user,
+    get_client,
+    measure,
+    seed_dataset
+)
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    ShoppingListItem
+)
+
+
+# Крупные единицы, в которых создаются копии ингредиентов.
+LARGER_UNITS = {'г': 'кг', 'мл': 'л'}
+
+# Замеряемые адреса.
+SHOPPING_LIST_URLS = {
+    'сводка': '/api/recipes/shopping_cart/summary/',
+    'txt': '/api/recipes/download_shopping_cart/?file_format=txt',
+    'json': '/api/recipes/download_shopping_cart/?file_format=json',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк выгрузки и сводки списка покупок, в котором одни и те же '
+        'продукты указаны в граммах и килограммах, миллилитрах и литрах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            nargs='+',
+            default=[100, 300, 500],
+            help='Размеры списка покупок, замеры идут по возрастанию.'
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['recipes'])
+        with benchmark_database(options['keepdb']):
+            if Recipe.objects.count() < sizes[-1]:
+                self.stdout.write('Наполнение базы данными...')
+                seed_dataset(
+                    recipes=sizes[-1], users=10, subscriptions=0,
+                    favorites=0
+                )
+                self.mix_units(random.Random(0))
+            user = get_benchmark_user()
+            client = get_client(user)
+            recipe_ids = list(
+                Recipe.objects.order_by('id').values_list('id', flat=True)
+            )
+            self.stdout.write(
+                f'{"рецептов":>9} {"строк":>6} {"итог":>6} '
+                f'{"ответ":<7} {"запр.":>6} {"p50":>8} {"p95":>8} '
+                f'{"p99":>8}'
+            )
+            for size in sizes:
+                ShoppingList.objects.add_recipes(user, recipe_ids[:size])
+                rows = ShoppingListItem.objects.filter(user=user).count()
+                summary = json.loads(
+                    client.get(SHOPPING_LIST_URLS['сводка']).content
+                )
+                for title, url in SHOPPING_LIST_URLS.items():
+                    result = measure(
+                        client, 'get', url, iterations=options['iterations']
+                    )
+                    self.stdout.write(
+                        f'{size:>9} {rows:>6} '
+                        f'{len(summary["ingredients"]):>6} {title:<7} '
+                        f'{result["queries"]:>6} {result["p50"]:>8} '
+                        f'{result["p95"]:>8} {result["p99"]:>8}'
+                    )
+
+    def mix_units(self, rnd):
+        """
+        Переводит половину ингредиентов рецептов в крупные единицы.
+
+        Для каждого ингредиента в граммах и миллилитрах создаётся копия в
+        килограммах и литрах, затем в каждом втором ингредиенте рецепта
+        продукт заменяется копией с небольшим количеством.
+        """
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=LARGER_UNITS[unit])
+                for name, unit in Ingredient.objects.filter(
+                    measurement_unit__in=LARGER_UNITS
+                ).values_list('name', 'measurement_unit')
+            ],
+            batch_size=SEED_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        larger = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.filter(
+                measurement_unit__in=LARGER_UNITS.values()
+            ).values_list('id', 'name', 'measurement_unit')
+        }
+        to_update = []
+        for number, item in enumerate(RecipeIngredient.objects.filter(
+            ingredient__measurement_unit__in=LARGER_UNITS
+        ).select_related('ingredient').order_by('id')):
+            if number % 2:
+                item.ingredient_id = larger[(
+                    item.ingredient.name,
+                    LARGER_UNITS[item.ingredient.measurement_unit]
+                )]
+                item.amount = rnd.randint(1, 5)
+                to_update.append(item)
+        RecipeIngredient.objects.bulk_update(
+            to_update, ['ingredient', 'amount'], batch_size=SEED_BATCH_SIZE
+        )
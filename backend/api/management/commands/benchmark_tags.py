@@ -0,0 +1,129 @@
+"""Модуль бенчмарка фильтра рецептов по тегам."""
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.benchmark import (
+    SEED_BATCH_SIZE,
+    benchmark_database,
+    get_client,
+    measure,
+    seed_dataset
+)
+from recipes.models import Recipe, Tag
+
+
+User = get_user_model()
+
+# Максимальное количество тегов у одного созданного рецепта.
+MAX_TAGS_PER_RECIPE = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк фильтра /api/recipes/?tags=... в режимах any и all при '
+        'росте количества рецептов и тегов в запросе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            nargs='+',
+            default=[10000, 50000, 100000],
+            help='Размеры базы рецептов, замеры идут по возрастанию.'
+        )
+        parser.add_argument(
+            '--tags',
+            type=int,
+            default=50,
+            help='Количество тегов в справочнике.'
+        )
+        parser.add_argument(
+            '--selected',
+            type=int,
+            nargs='+',
+            default=[1, 2, 5, 10],
+            help='Количество тегов в запросе.'
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(0)
+        with benchmark_database(options['keepdb']):
+            if not User.objects.exists():
+                self.stdout.write('Наполнение базы данными...')
+                seed_dataset(
+                    recipes=0, users=100, subscriptions=0, favorites=0
+                )
+            slugs = self.prepare_tags(options['tags'])
+            client = get_client()
+            self.stdout.write(
+                f'{"рецептов":>9} {"тегов":>6} {"режим":<6} {"запр.":>6} '
+                f'{"p50":>8} {"p95":>8} {"p99":>8}'
+            )
+            for recipes in sorted(options['recipes']):
+                self.add_recipes(recipes - Recipe.objects.count())
+                for selected in options['selected']:
+                    query = '&'.join(
+                        f'tags={slug}' for slug in slugs[:selected]
+                    )
+                    for mode in ('any', 'all'):
+                        result = measure(
+                            client,
+                            'get',
+                            f'/api/recipes/?{query}&tags_mode={mode}',
+                            iterations=options['iterations']
+                        )
+                        self.stdout.write(
+                            f'{recipes:>9} {selected:>6} {mode:<6} '
+                            f'{result["queries"]:>6} {result["p50"]:>8} '
+                            f'{result["p95"]:>8} {result["p99"]:>8}'
+                        )
+
+    def prepare_tags(self, count):
+        """Дополняет справочник тегов до count, возвращает их slug."""
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create([
+            Tag(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(existing, count)
+        ])
+        return list(Tag.objects.order_by('id').values_list('slug', flat=True))
+
+    def add_recipes(self, count):
+        """Создаёт count рецептов со случайными тегами."""
+        if count <= 0:
+            return
+        self.stdout.write(f'Добавление рецептов: {count}...')
+        user_ids = list(User.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        start = Recipe.objects.count()
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author_id=self.rnd.choice(user_ids),
+                    name=f'Рецепт {number}',
+                    text=f'Описание рецепта {number}.',
+                    cooking_time=self.rnd.randint(1, 240),
+                    shortcode=f'{number:08x}',
+                ) for number in range(start, start + count)
+            ],
+            batch_size=SEED_BATCH_SIZE
+        )
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in Recipe.objects.order_by(
+                    '-id'
+                ).values_list('id', flat=True)[:count]
+                for tag_id in self.rnd.sample(
+                    tag_ids,
+                    self.rnd.randint(
+                        1, min(MAX_TAGS_PER_RECIPE, len(tag_ids))
+                    )
+                )
+            ],
+            batch_size=SEED_BATCH_SIZE
+        )
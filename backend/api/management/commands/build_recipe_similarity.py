@@ -0,0 +1,65 @@
+"""Модуль полной сборки индекса похожих рецептов."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from api.similarity import build_similarity_index
+from recipes.constants import SIMILAR_RECIPES_COUNT, SIMILARITY_MAX_DF
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит индекс похожих рецептов по ингредиентам и заменяет им '
+        'текущий. Изменения рецептов между сборками дописываются в журнал '
+        'индекса автоматически, сборка удаляет из журнала учтённые записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.RECIPE_SIMILARITY_PATH
+        )
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=SIMILAR_RECIPES_COUNT,
+            help='Количество похожих рецептов, хранимых для каждого.'
+        )
+        parser.add_argument(
+            '--max-df',
+            type=float,
+            default=SIMILARITY_MAX_DF,
+            help=('Доля рецептов, начиная с которой ингредиент не '
+                  'используется для поиска кандидатов.')
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help=('Пересобирать индекс каждые N секунд, 0 — один раз. '
+                  'Ошибка базы в этом режиме не прерывает работу: '
+                  'сборка повторится через N секунд.')
+        )
+
+    def build(self, options):
+        stats = build_similarity_index(
+            options['path'], options['neighbours'], options['max_df']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс построен: рецептов {stats["recipes"]}, ингредиентов '
+            f'{stats["ingredients"]}, {stats["size"] / 1024:.0f} КБ, '
+            f'{stats["elapsed"]:.2f} с.'
+        ))
+
+    def handle(self, *args, **options):
+        if not options['interval']:
+            self.build(options)
+            return
+        while True:
+            try:
+                self.build(options)
+            except DatabaseError as error:
+                self.stderr.write(f'Индекс не построен: {error}')
+            close_old_connections()
+            time.sleep(options['interval'])
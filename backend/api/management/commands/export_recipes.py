@@ -0,0 +1,76 @@
+"""Модуль экспорта рецептов в файл JSON Lines."""
+import json
+import os
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.transfer import (
+    TRANSFER_BATCH_SIZE,
+    encode_image,
+    iter_export_batches,
+    recipe_to_record,
+    worker_map
+)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Экспортирует рецепты в файл JSON Lines, который принимает '
+        'команда import_recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или - для вывода в stdout.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов для изображений, 1 — без пула.'
+        )
+        parser.add_argument(
+            '--skip-images',
+            action='store_true',
+            help='Не включать изображения в файл.'
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            file = nullcontext(sys.stdout)
+            log = self.stderr
+        else:
+            try:
+                file = open(options['path'], 'w', encoding='utf-8')
+            except OSError as error:
+                raise CommandError(error)
+            log = self.stdout
+
+        exported = 0
+        with file as file, worker_map(options['workers']) as map_images:
+            batches = iter_export_batches(
+                Recipe.objects.all(), options['batch_size']
+            )
+            for batch in batches:
+                if options['skip_images']:
+                    images = [None] * len(batch)
+                else:
+                    images = map_images(
+                        encode_image, [recipe.image.name for recipe in batch]
+                    )
+                for recipe, image in zip(batch, images):
+                    file.write(json.dumps(
+                        recipe_to_record(recipe, image), ensure_ascii=False
+                    ))
+                    file.write('\n')
+                exported += len(batch)
+
+        log.write(self.style.SUCCESS(
+            f'Экспортировано рецептов: {exported}.'
+        ))
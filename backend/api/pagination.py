@@ -1,9 +1,163 @@
 """Модуль пагинатора."""
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
 
-from recipes.constants import PAGINATION_PAGE_SIZE
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.constants import MAX_PAGE_SIZE, PAGINATION_PAGE_SIZE
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = PAGINATION_PAGE_SIZE
     page_size_query_param = 'limit'
+
+
+def estimate_count(queryset):
+    """
+    Возвращает примерное количество объектов в queryset.
+
+    В PostgreSQL для запроса без условий берётся reltuples из pg_class,
+    для запроса с условиями — оценка планировщика из EXPLAIN.
+    На остальных СУБД выполняется обычный COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            estimate = cursor.fetchone()[0]
+            if estimate >= 0:
+                return estimate
+            return queryset.count()
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return cursor.fetchone()[0][0]['Plan']['Plan Rows']
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (поле, id) без OFFSET, по умолчанию (created_at, id).
+
+    Страница выбирается условием по последней записи предыдущей страницы,
+    поэтому время ответа не зависит от глубины пролистывания. Общее
+    количество по умолчанию не считается, параметр count принимает
+    значения exact, estimate и none.
+    """
+
+    page_size = PAGINATION_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, keyset=('created_at', 'id')):
+        self.keyset = keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        field, pk_field = self.keyset
+        queryset = queryset.order_by(f'-{field}', f'-{pk_field}')
+        position = self.decode_cursor(request, queryset)
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value})
+                | Q(**{field: value, f'{pk_field}__lt': pk})
+            )
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_count(self, queryset, request):
+        """Считает общее количество согласно параметру count."""
+        mode = request.query_params.get(self.count_query_param, 'none')
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    def get_key_field(self, queryset):
+        """Возвращает поле модели или аннотации, по которому идёт ключ."""
+        field = self.keyset[0]
+        if field in queryset.query.annotations:
+            return queryset.query.annotations[field].output_field
+        return queryset.model._meta.get_field(field)
+
+    def decode_cursor(self, request, queryset):
+        """Возвращает позицию (значение, id) из параметра cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = self.get_key_field(queryset).to_python(value)
+            pk = int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def encode_cursor(self, obj):
+        """Кодирует позицию объекта в строку для параметра cursor."""
+        field, pk_field = self.keyset
+        value = getattr(obj, field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        position = [value, getattr(obj, pk_field)]
+        return base64.urlsafe_b64encode(
+            json.dumps(position).encode()
+        ).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+
+def get_paginator(request, keyset=('created_at', 'id')):
+    """Возвращает пагинатор по ключу, если в запросе передан cursor."""
+    if KeysetPagination.cursor_query_param in request.query_params:
+        return KeysetPagination(keyset)
+    return LimitPageNumberPagination()
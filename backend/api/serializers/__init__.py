@@ -2,16 +2,19 @@
 from .fields import Base64ImageField
 from .recipes import (
     IngredientSerializer,
+    RecipeBulkSerializer,
     RecipeCreateSerializer,
     RecipeReadingSerializer,
     RecipeShortResponseSerializer,
+    ShoppingListIngredientSerializer,
     ShortLinkSerializer,
     TagSerializer
 )
 from .users import (
     AvatarUpdateSerializer,
     UserDetailSerializer,
-    SubscriptionsSerializer
+    SubscriptionsSerializer,
+    get_recipes_limit
 )
 
 
@@ -20,10 +23,13 @@ __all__ = [
     'Base64ImageField',
     'UserDetailSerializer',
     'IngredientSerializer',
+    'RecipeBulkSerializer',
     'RecipeCreateSerializer',
     'RecipeReadingSerializer',
     'RecipeShortResponseSerializer',
+    'ShoppingListIngredientSerializer',
     'ShortLinkSerializer',
     'SubscriptionsSerializer',
-    'TagSerializer'
+    'TagSerializer',
+    'get_recipes_limit'
 ]
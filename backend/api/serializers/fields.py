@@ -1,18 +1,214 @@
 """Модуль предоставляет поля для сериализаторов."""
 import base64
+import binascii
+import io
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile
+)
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+# Допустимые типы изображений: расширение и сигнатура начала файла.
+IMAGE_TYPES = {
+    'image/jpeg': ('jpg', (b'\xff\xd8\xff',)),
+    'image/jpg': ('jpg', (b'\xff\xd8\xff',)),
+    'image/png': ('png', (b'\x89PNG\r\n\x1a\n',)),
+    'image/gif': ('gif', (b'GIF87a', b'GIF89a')),
+    'image/webp': ('webp', (b'RIFF',)),
+}
+
+# Размер части base64-строки, декодируемой за один шаг (кратен 4).
+BASE64_CHUNK_SIZE = 64 * 1024
+
+# Максимальная длина заголовка data:image/...;base64,
+DATA_URL_HEADER_MAX_LENGTH = 64
+
+# Пробельные символы, которые допускаются внутри base64, например
+# переносы строк через каждые 76 символов в стиле MIME.
+BASE64_WHITESPACE = ' \t\n\r\v\f'
 
 
 class Base64ImageField(serializers.ImageField):
-    """Поле для загрузки изображений в формате base64."""
+    """
+    Поле для загрузки изображений в формате base64.
+
+    Тип и размер проверяются до декодирования, затем строка декодируется
+    частями: небольшие файлы собираются в памяти, большие пишутся во
+    временный файл, как при обычной загрузке файлов в Django. Пробелы и
+    переносы строк внутри base64 пропускаются.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Некорректные данные base64.',
+        'invalid_type': 'Недопустимый тип изображения: {mime}.',
+        'invalid_header': 'Содержимое не соответствует типу {mime}.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+
+    def __init__(self, *args, max_size=None, **kwargs):
+        self.max_size = max_size
+        super().__init__(*args, **kwargs)
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            data = self.decode(data)
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    def decode(self, data):
+        """Декодирует data URL в загруженный файл."""
+        separator = data.find(';base64,', 0, DATA_URL_HEADER_MAX_LENGTH)
+        if separator == -1:
+            self.fail('invalid_base64')
+        mime = data[len('data:'):separator]
+        if mime not in IMAGE_TYPES:
+            self.fail('invalid_type', mime=mime)
+        extension, signatures = IMAGE_TYPES[mime]
 
-        return super().to_internal_value(data)
+        start = separator + len(';base64,')
+        data = data.rstrip(BASE64_WHITESPACE)
+        encoded_length = len(data) - start - sum(
+            data.count(char, start) for char in BASE64_WHITESPACE
+        )
+        size = encoded_length // 4 * 3 - data.count('=', len(data) - 2)
+        if self.max_size is not None and size > self.max_size:
+            self.fail('too_large', max_size=self.max_size)
+
+        name = f'temp.{extension}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile(name, mime, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                io.BytesIO(), None, name, mime, size, None
+            )
+
+        try:
+            for chunk in self.iter_chunks(data, start):
+                if not file.tell() and not chunk.startswith(signatures):
+                    self.fail('invalid_header', mime=mime)
+                file.write(chunk)
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_base64')
+        except serializers.ValidationError:
+            file.close()
+            raise
+
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def iter_chunks(self, data, start):
+        """
+        Возвращает декодированные части base64-строки data от start.
+
+        Из каждой части удаляются пробельные символы, а остаток, не
+        кратный 4 символам, переносится в следующую часть.
+        """
+        remove_whitespace = str.maketrans('', '', BASE64_WHITESPACE)
+        rest = ''
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            encoded = rest + data[
+                position:position + BASE64_CHUNK_SIZE
+            ].translate(remove_whitespace)
+            end = len(encoded) // 4 * 4
+            rest = encoded[end:]
+            if end:
+                yield base64.b64decode(encoded[:end], validate=True)
+        if rest:
+            yield base64.b64decode(rest, validate=True)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле связи по первичному ключу, проверяющее список id одним запросом.
+
+    С many=True все объекты загружаются одним запросом id__in, а в ошибке
+    перечисляются все несуществующие id. Одиночное поле проверяет только
+    тип id: объекты для всех элементов списка вложенных сериализаторов
+    загружает BulkResolveListSerializer.
+    """
+
+    default_error_messages = {
+        'does_not_exist_many': 'Не найдены объекты с id: {pk_values}.',
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        max_length = kwargs.pop('max_length', None)
+        list_kwargs = {
+            'child_relation': cls(*args, **kwargs),
+            'max_length': max_length,
+        }
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        """Возвращает id, приведённый к типу первичного ключа."""
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if data is None or isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        """Возвращает объекты для списка id в том же порядке."""
+        objects = self.get_queryset().in_bulk(set(pks))
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist_many',
+                pk_values=', '.join(str(pk) for pk in missing)
+            )
+        return [objects[pk] for pk in pks]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список связей, загружаемый одним запросом."""
+
+    default_error_messages = {
+        'max_length': 'Не больше {max_length} элементов.',
+    }
+
+    def __init__(self, max_length=None, **kwargs):
+        self.max_length = max_length
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        if self.max_length is not None and len(data) > self.max_length:
+            self.fail('max_length', max_length=self.max_length)
+        return self.child_relation.resolve([
+            self.child_relation.to_internal_value(item) for item in data
+        ])
+
+
+class BulkResolveListSerializer(serializers.ListSerializer):
+    """
+    Список вложенных сериализаторов, в котором поля
+    BulkPrimaryKeyRelatedField всех элементов загружаются одним запросом.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        for field in self.child.fields.values():
+            if (field.read_only
+                    or not isinstance(field, BulkPrimaryKeyRelatedField)):
+                continue
+            present = [item for item in items if field.source in item]
+            objects = field.resolve([item[field.source] for item in present])
+            for item, obj in zip(present, objects):
+                item[field.source] = obj
+        return items
@@ -2,11 +2,19 @@
 from django.db import transaction
 from rest_framework import serializers
 
-from .fields import Base64ImageField
+from .fields import (
+    Base64ImageField,
+    BulkPrimaryKeyRelatedField,
+    BulkResolveListSerializer
+)
+from ..images import get_variant_urls
+from ..similarity import schedule_similarity_update
+from recipes.constants import BULK_RECIPES_MAX_LENGTH, RECIPE_IMAGE_MAX_SIZE
 from recipes.models import (
     Ingredient,
     Recipe,
     RecipeIngredient,
+    ShoppingListItem,
     Tag
 )
 from .users import UserDetailSerializer
@@ -31,9 +39,7 @@ class TagSerializer(serializers.ModelSerializer):
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для модели RecipeIngredient"""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
         source='ingredient.measurement_unit'
@@ -42,6 +48,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = BulkResolveListSerializer
 
 
 class RecipeReadingSerializer(serializers.ModelSerializer):
@@ -59,6 +66,9 @@ class RecipeReadingSerializer(serializers.ModelSerializer):
         read_only=True,
         default=False
     )
+    image_variants = serializers.SerializerMethodField()
+    # Есть в ответе только при поиске по параметру search.
+    search_snippet = serializers.CharField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -70,9 +80,17 @@ class RecipeReadingSerializer(serializers.ModelSerializer):
             'is_favorited',
             'is_in_shopping_cart',
             'image',
+            'image_variants',
             'name',
             'text',
             'cooking_time',
+            'search_snippet',
+        )
+
+    def get_image_variants(self, obj):
+        """Возвращает ссылки на уменьшенные копии изображения."""
+        return get_variant_urls(
+            obj, 'image', 'image_variants', self.context.get('request')
         )
 
 
@@ -80,12 +98,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания рецепта."""
 
     ingredients = RecipeIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
         required=True,
     )
-    image = Base64ImageField(required=True)
+    image = Base64ImageField(required=True, max_size=RECIPE_IMAGE_MAX_SIZE)
 
     class Meta:
         model = Recipe
@@ -139,6 +157,55 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         ])
 
+    def update_recipe_ingredients(self, ingredients, recipe):
+        """
+        Приводит ингредиенты рецепта к новому списку.
+
+        Меняются только отличающиеся строки: новые ингредиенты
+        добавляются, у оставшихся обновляется количество, убранные
+        удаляются. Разница количеств переносится в сводные списки
+        покупок и счётчик ингредиентов рецепта: для добавленных и
+        изменённых строк здесь, для удалённых — сигналами post_delete.
+        Возвращает True, если набор ингредиентов изменился.
+        """
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
+            )
+        }
+        to_create = []
+        to_update = []
+        changes = {}
+        for ingredient in ingredients:
+            current = existing.pop(ingredient['id'].id, None)
+            if current is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient['id'],
+                    amount=ingredient['amount']
+                ))
+                changes[ingredient['id'].id] = ingredient['amount']
+            elif current.amount != ingredient['amount']:
+                changes[current.ingredient_id] = (
+                    ingredient['amount'] - current.amount
+                )
+                current.amount = ingredient['amount']
+                to_update.append(current)
+
+        if existing:
+            RecipeIngredient.objects.filter(
+                pk__in=[item.pk for item in existing.values()]
+            ).delete()
+        RecipeIngredient.objects.bulk_create(to_create)
+        if to_create:
+            Recipe.objects.filter(pk=recipe.pk).add_to_counter(
+                'ingredients_count', len(to_create)
+            )
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        ShoppingListItem.objects.change_recipe(recipe.pk, changes)
+        return bool(existing or to_create)
+
     @transaction.atomic
     def create(self, validated_data):
         """Переопределяем create для обработки связанных данных."""
@@ -146,10 +213,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
 
         validated_data['author'] = self.context['request'].user
+        validated_data['ingredients_count'] = len(ingredients)
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
 
         self.add_ingredients_to_recipe(ingredients, recipe)
+        schedule_similarity_update(recipe)
 
         return recipe
 
@@ -161,14 +230,22 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         recipe = super().update(recipe, validated_data)
         recipe.tags.set(tags)
-        recipe.ingredients.clear()
 
-        self.add_ingredients_to_recipe(ingredients, recipe)
+        if self.update_recipe_ingredients(ingredients, recipe):
+            schedule_similarity_update(recipe)
 
         return recipe
 
     def to_representation(self, recipe):
-        """Указываем какой сериализатор должен формировать ответ."""
+        """
+        Указываем какой сериализатор должен формировать ответ.
+
+        Рецепт перечитывается с пакетной загрузкой связей, чтобы ответ не
+        запрашивал каждый ингредиент отдельно.
+        """
+        recipe = Recipe.objects.for_read(self.context['request'].user).get(
+            pk=recipe.pk
+        )
         return RecipeReadingSerializer(recipe, context=self.context).data
 
 
@@ -189,3 +266,25 @@ class RecipeShortResponseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ['id', 'name', 'image', 'cooking_time']
+
+
+class ShoppingListIngredientSerializer(serializers.Serializer):
+    """Сериализатор строки сводного списка покупок."""
+
+    name = serializers.CharField(source='ingredient__name')
+    measurement_unit = serializers.CharField(
+        source='ingredient__measurement_unit'
+    )
+    amount = serializers.ReadOnlyField(source='total_amount')
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    """Список рецептов для массового изменения избранного или покупок."""
+
+    recipes = BulkPrimaryKeyRelatedField(
+        queryset=Recipe.objects.only(
+            *RecipeShortResponseSerializer.Meta.fields
+        ),
+        many=True,
+        max_length=BULK_RECIPES_MAX_LENGTH
+    )
@@ -4,11 +4,23 @@ from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
 from .fields import Base64ImageField
+from users.constants import AVATAR_MAX_SIZE
+from ..images import get_variant_urls
 
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Возвращает ограничение на количество рецептов из recipes_limit."""
+    if request is None:
+        return None
+    try:
+        return int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+
+
 class UserDetailSerializer(UserSerializer):
     """Сериализатор для пользователей."""
 
@@ -16,6 +28,7 @@ class UserDetailSerializer(UserSerializer):
         'get_avatar_url',
         read_only=True,
     )
+    avatar_variants = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -28,10 +41,13 @@ class UserDetailSerializer(UserSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_variants',
         )
 
     def get_is_subscribed(self, obj):
         """Возвращает, подписку автора на пользователя"""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and obj.subscribers.filter(user=request.user).exists())
@@ -41,12 +57,18 @@ class UserDetailSerializer(UserSerializer):
         if obj.avatar:
             return obj.avatar.url
 
+    def get_avatar_variants(self, obj):
+        """Возвращает ссылки на уменьшенные копии аватара."""
+        return get_variant_urls(
+            obj, 'avatar', 'avatar_variants', self.context.get('request')
+        )
+
 
 class SubscriptionsSerializer(UserDetailSerializer):
     """Сериализатор с добавлением полей для выдачи подписок пользователя."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserDetailSerializer.Meta):
         fields = UserDetailSerializer.Meta.fields + (
@@ -54,25 +76,17 @@ class SubscriptionsSerializer(UserDetailSerializer):
             'recipes_count',
         )
 
-    def get_recipes_count(self, obj):
-        """Возвращает количество рецептов пользователя."""
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
         """Возвращает рецепты пользователя."""
         from .recipes import RecipeShortResponseSerializer
-        request = self.context.get('request')
-        recipes_limit = None
-
-        if request:
-            try:
-                recipes_limit = int(request.query_params.get('recipes_limit'))
-            except (TypeError, ValueError):
-                recipes_limit = None
 
-        recipes_queryset = obj.recipes.all()
-        if recipes_limit:
-            recipes_queryset = recipes_queryset[:recipes_limit]
+        if hasattr(obj, 'latest_recipes'):
+            recipes_queryset = obj.latest_recipes
+        else:
+            recipes_queryset = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit:
+                recipes_queryset = recipes_queryset[:recipes_limit]
 
         return RecipeShortResponseSerializer(
             recipes_queryset,
@@ -84,7 +98,7 @@ class SubscriptionsSerializer(UserDetailSerializer):
 class AvatarUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор обновления аватара."""
 
-    avatar = Base64ImageField(required=True)
+    avatar = Base64ImageField(required=True, max_size=AVATAR_MAX_SIZE)
 
     class Meta:
         model = User
@@ -0,0 +1,35 @@
+"""Модуль сигналов приложения api."""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Recipe, Tag
+from .cache import invalidate_reference
+from .images import schedule_image_variants
+
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Сбрасывает кэш справочника тегов."""
+    invalidate_reference('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Сбрасывает кэш справочника ингредиентов."""
+    invalidate_reference('ingredients')
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    """Готовит уменьшенные копии изображения рецепта."""
+    schedule_image_variants(instance, 'image', 'image_variants')
+
+
+@receiver(post_save, sender=User)
+def process_user_avatar(sender, instance, **kwargs):
+    """Готовит уменьшенные копии аватара пользователя."""
+    schedule_image_variants(instance, 'avatar', 'avatar_variants')
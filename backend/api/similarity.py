@@ -0,0 +1,490 @@
+"""
+Модуль рекомендаций рецептов по ингредиентам.
+
+Рецепт описывается TF-IDF вектором своих ингредиентов, похожесть —
+косинусная мера. Снимок индекса хранится в одном бинарном файле из
+массивов фиксированной ширины (матрица в формате CSR, обратный индекс
+ингредиент -> рецепты в формате CSC и таблица top-k соседей) и
+открывается через mmap, поэтому процессы сервера делят одну копию в
+памяти, а поиск соседей не обращается к базе.
+
+Изменения рецептов между полными пересборками дописываются в журнал
+рядом со снимком: новые векторы и списки соседей перекрывают записи
+снимка.
+"""
+import bisect
+import fcntl
+import heapq
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from recipes.constants import SIMILAR_RECIPES_COUNT, SIMILARITY_MAX_DF
+from recipes.models import RecipeIngredient
+from .images import get_executor
+
+
+logger = logging.getLogger(__name__)
+
+# Заголовок снимка: сигнатура, число рецептов, ингредиентов, ненулевых
+# элементов матрицы и соседей на рецепт.
+MAGIC = b'RSIM0001'
+HEADER = struct.Struct('<8sqqqq')
+
+# Заголовок записи журнала: id рецепта, число ингредиентов и соседей.
+RECORD_HEADER = struct.Struct('<qqq')
+
+# Размер элемента всех массивов снимка и журнала (int64 и float64).
+ITEM_SIZE = 8
+
+
+def get_idf(df, total):
+    """Возвращает сглаженный IDF ингредиента."""
+    return math.log((1 + total) / (1 + df)) + 1
+
+
+def normalize(vector):
+    """Нормирует вектор {ингредиент: вес} по длине."""
+    length = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not length:
+        return {}
+    return {key: weight / length for key, weight in vector.items()}
+
+
+def cosine(first, second):
+    """Возвращает скалярное произведение нормированных векторов."""
+    if len(first) > len(second):
+        first, second = second, first
+    return sum(
+        weight * second.get(key, 0.0) for key, weight in first.items()
+    )
+
+
+def top_k(scores, k):
+    """Возвращает k пар (id, оценка) с наибольшей оценкой."""
+    return heapq.nlargest(
+        k, scores.items(), key=lambda item: (item[1], -item[0])
+    )
+
+
+def encode_record(recipe_id, vector, neighbours):
+    """Кодирует запись журнала."""
+    keys = sorted(vector)
+    return b''.join((
+        RECORD_HEADER.pack(recipe_id, len(keys), len(neighbours)),
+        array('q', keys).tobytes(),
+        array('d', (vector[key] for key in keys)).tobytes(),
+        array('q', (pk for pk, _ in neighbours)).tobytes(),
+        array('d', (score for _, score in neighbours)).tobytes(),
+    ))
+
+
+class SimilarityIndex:
+    """
+    Снимок индекса похожести в mmap и журнал изменений поверх него.
+
+    Перед чтением вызывается refresh(): он сравнивает inode и размер
+    файлов с прочитанными и подгружает только изменения.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.log_path = f'{path}.log'
+        self.lock = threading.Lock()
+        self.snapshot_key = None
+        self.log_key = None
+        self.log_offset = 0
+        self.load_snapshot(None)
+
+    def refresh(self):
+        """Перечитывает снимок и дочитывает журнал, если они изменились."""
+        with self.lock:
+            snapshot_key = self.get_file_key(self.path)
+            if snapshot_key != self.snapshot_key:
+                self.load_snapshot(snapshot_key)
+            log_key = self.get_file_key(self.log_path)
+            if (log_key is None or self.log_key is None
+                    or log_key[0] != self.log_key[0]):
+                self.vectors = {}
+                self.neighbour_lists = {}
+                self.log_offset = 0
+            self.log_key = log_key
+            if log_key is not None and log_key[1] > self.log_offset:
+                self.read_log()
+        return self
+
+    @staticmethod
+    def get_file_key(path):
+        """Возвращает (inode, размер) файла или None, если его нет."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def load_snapshot(self, snapshot_key):
+        """Открывает снимок через mmap и размечает массивы в нём."""
+        self.snapshot_key = snapshot_key
+        self.vectors = {}
+        self.neighbour_lists = {}
+        self.log_offset = 0
+        self.log_key = None
+        if snapshot_key is None:
+            self.total, self.k = 0, SIMILAR_RECIPES_COUNT
+            self.recipe_ids = self.ingredient_ids = ()
+            return
+        with open(self.path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, recipes, ingredients, nnz, self.k = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f'Неизвестный формат индекса: {self.path}')
+        self.total = recipes
+        view = memoryview(buffer)
+        offset = HEADER.size
+
+        def take(count, type_code):
+            nonlocal offset
+            end = offset + count * ITEM_SIZE
+            part = view[offset:end].cast(type_code)
+            offset = end
+            return part
+
+        self.recipe_ids = take(recipes, 'q')
+        self.indptr = take(recipes + 1, 'q')
+        self.indices = take(nnz, 'q')
+        self.data = take(nnz, 'd')
+        self.ingredient_ids = take(ingredients, 'q')
+        self.idf = take(ingredients, 'd')
+        self.column_indptr = take(ingredients + 1, 'q')
+        self.column_rows = take(nnz, 'q')
+        self.neighbour_ids = take(recipes * self.k, 'q')
+        self.neighbour_scores = take(recipes * self.k, 'd')
+
+    def read_log(self):
+        """Дочитывает новые записи журнала."""
+        with open(self.log_path, 'rb') as file:
+            file.seek(self.log_offset)
+            content = file.read()
+        position = 0
+        while position + RECORD_HEADER.size <= len(content):
+            recipe_id, terms, count = RECORD_HEADER.unpack_from(
+                content, position
+            )
+            end = (position + RECORD_HEADER.size
+                   + (terms + count) * 2 * ITEM_SIZE)
+            if end > len(content):
+                break
+            values = memoryview(content)[position + RECORD_HEADER.size:end]
+            keys = values[:terms * ITEM_SIZE].cast('q')
+            weights = values[terms * ITEM_SIZE:terms * 2 * ITEM_SIZE]
+            ids = values[terms * 2 * ITEM_SIZE:][:count * ITEM_SIZE]
+            scores = values[terms * 2 * ITEM_SIZE + count * ITEM_SIZE:]
+            self.vectors[recipe_id] = dict(zip(keys, weights.cast('d')))
+            self.neighbour_lists[recipe_id] = list(
+                zip(ids.cast('q'), scores.cast('d'))
+            )
+            position = end
+        self.log_offset += position
+
+    def find_row(self, recipe_id):
+        """Возвращает номер строки рецепта в снимке или None."""
+        row = bisect.bisect_left(self.recipe_ids, recipe_id)
+        if row < len(self.recipe_ids) and self.recipe_ids[row] == recipe_id:
+            return row
+        return None
+
+    def find_column(self, ingredient_id):
+        """Возвращает номер столбца ингредиента в снимке или None."""
+        column = bisect.bisect_left(self.ingredient_ids, ingredient_id)
+        if (column < len(self.ingredient_ids)
+                and self.ingredient_ids[column] == ingredient_id):
+            return column
+        return None
+
+    def get_vector(self, recipe_id):
+        """Возвращает TF-IDF вектор рецепта."""
+        if recipe_id in self.vectors:
+            return self.vectors[recipe_id]
+        row = self.find_row(recipe_id)
+        if row is None:
+            return {}
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return dict(zip(self.indices[start:end], self.data[start:end]))
+
+    def get_neighbours(self, recipe_id):
+        """Возвращает список соседей рецепта [(id, оценка), ...]."""
+        if recipe_id in self.neighbour_lists:
+            return self.neighbour_lists[recipe_id]
+        row = self.find_row(recipe_id)
+        if row is None:
+            return []
+        start = row * self.k
+        return [
+            (pk, score) for pk, score in zip(
+                self.neighbour_ids[start:start + self.k],
+                self.neighbour_scores[start:start + self.k]
+            ) if pk
+        ]
+
+    def make_vector(self, ingredient_ids):
+        """Строит нормированный вектор рецепта по IDF из снимка."""
+        vector = {}
+        for ingredient_id in ingredient_ids:
+            column = self.find_column(ingredient_id)
+            vector[ingredient_id] = (
+                self.idf[column] if column is not None
+                else get_idf(0, self.total)
+            )
+        return normalize(vector)
+
+    def find_similar(self, recipe_id, vector):
+        """
+        Возвращает top-k соседей для вектора.
+
+        Кандидаты берутся из обратного индекса по ингредиентам рецепта
+        и из журнала, оценка считается точно по векторам кандидатов.
+        """
+        candidates = set()
+        for ingredient_id in vector:
+            column = self.find_column(ingredient_id)
+            if column is not None:
+                candidates.update(
+                    self.recipe_ids[row] for row in self.column_rows[
+                        self.column_indptr[column]:
+                        self.column_indptr[column + 1]
+                    ]
+                )
+        candidates.update(
+            pk for pk, other in self.vectors.items()
+            if not other.keys().isdisjoint(vector)
+        )
+        candidates.discard(recipe_id)
+        scores = {pk: cosine(vector, self.get_vector(pk)) for pk in candidates}
+        return top_k(
+            {pk: score for pk, score in scores.items() if score > 0}, self.k
+        )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Возвращает актуальный индекс похожести этого процесса."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(settings.RECIPE_SIMILARITY_PATH)
+    return _index.refresh()
+
+
+def get_similar_recipe_ids(recipe_id, limit):
+    """Возвращает id похожих рецептов без запросов к базе."""
+    return [
+        pk for pk, _ in get_similarity_index().get_neighbours(recipe_id)
+    ][:limit]
+
+
+@contextmanager
+def lock_log(log_path, mode):
+    """
+    Открывает журнал и берёт на нём исключительную блокировку.
+
+    truncate_log подменяет файл журнала через os.replace. Процесс, который
+    открыл старый файл до подмены, получит блокировку уже на удалённом
+    файле, поэтому после блокировки файл сверяется с путём и при
+    расхождении открывается заново.
+    """
+    while True:
+        file = open(log_path, mode)
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                current = os.stat(log_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(file.fileno()).st_ino:
+                break
+        except BaseException:
+            file.close()
+            raise
+        file.close()
+    try:
+        yield file
+    finally:
+        # Буфер записывается до снятия блокировки, а не при закрытии.
+        file.flush()
+        fcntl.flock(file, fcntl.LOCK_UN)
+        file.close()
+
+
+def append_records(path, records):
+    """Дописывает записи в журнал под блокировкой файла."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with lock_log(f'{path}.log', 'ab') as file:
+        file.write(b''.join(encode_record(*record) for record in records))
+
+
+def update_recipe_similarity(recipe_id):
+    """
+    Пересчитывает соседей рецепта и добавляет его в списки соседей.
+
+    Рецепт попадает в список соседа, если похож на него больше, чем
+    последний рецепт списка. Остальные списки обновит полная пересборка.
+    """
+    try:
+        index = get_similarity_index()
+        vector = index.make_vector(
+            RecipeIngredient.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', flat=True)
+        )
+        neighbours = index.find_similar(recipe_id, vector)
+        records = [(recipe_id, vector, neighbours)]
+        for neighbour_id, score in neighbours:
+            current = [
+                item for item in index.get_neighbours(neighbour_id)
+                if item[0] != recipe_id
+            ]
+            if len(current) < index.k or score > current[-1][1]:
+                current.append((recipe_id, score))
+                records.append((
+                    neighbour_id,
+                    index.get_vector(neighbour_id),
+                    top_k(dict(current), index.k)
+                ))
+        append_records(index.path, records)
+    except Exception:
+        logger.exception('Не удалось обновить похожие для %s', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_similarity_update(recipe):
+    """Ставит пересчёт похожих рецептов в фон после фиксации транзакции."""
+    recipe_id = recipe.pk
+    transaction.on_commit(
+        lambda: get_executor().submit(update_recipe_similarity, recipe_id)
+    )
+
+
+def build_similarity_index(path, k=SIMILAR_RECIPES_COUNT,
+                           max_df=SIMILARITY_MAX_DF):
+    """
+    Строит снимок индекса по всем рецептам и заменяет им текущий.
+
+    Кандидаты в соседи ищутся только по ингредиентам, которые есть не
+    более чем в max_df доле рецептов (но хотя бы по самому редкому):
+    соль или сахар почти не влияют на оценку, а их списки огромны.
+    Записи журнала, сделанные до начала сборки, после замены удаляются.
+    Возвращает словарь со статистикой.
+    """
+    started = time.perf_counter()
+    log_path = f'{path}.log'
+    log_key = SimilarityIndex.get_file_key(log_path)
+    log_size = log_key[1] if log_key else 0
+
+    ingredients_by_recipe = defaultdict(list)
+    for recipe_id, ingredient_id in RecipeIngredient.objects.order_by(
+    ).values_list('recipe_id', 'ingredient_id').iterator():
+        ingredients_by_recipe[recipe_id].append(ingredient_id)
+    recipe_ids = array('q', sorted(ingredients_by_recipe))
+    total = len(recipe_ids)
+    df = Counter(
+        ingredient_id
+        for ingredient_ids in ingredients_by_recipe.values()
+        for ingredient_id in set(ingredient_ids)
+    )
+    ingredient_ids = array('q', sorted(df))
+    idf = array('d', (get_idf(df[pk], total) for pk in ingredient_ids))
+    idf_by_id = dict(zip(ingredient_ids, idf))
+
+    indptr, indices, data = array('q', [0]), array('q'), array('d')
+    columns = defaultdict(list)
+    for row, recipe_id in enumerate(recipe_ids):
+        vector = normalize({
+            pk: idf_by_id[pk] for pk in ingredients_by_recipe.pop(recipe_id)
+        })
+        for ingredient_id in sorted(vector):
+            indices.append(ingredient_id)
+            data.append(vector[ingredient_id])
+            columns[ingredient_id].append(row)
+        indptr.append(len(indices))
+
+    column_indptr, column_rows = array('q', [0]), array('q')
+    for ingredient_id in ingredient_ids:
+        column_rows.extend(columns.pop(ingredient_id))
+        column_indptr.append(len(column_rows))
+
+    column_by_id = {pk: column for column, pk in enumerate(ingredient_ids)}
+    max_count = max_df * total
+    neighbour_ids, neighbour_scores = array('q'), array('d')
+    for row in range(total):
+        start, end = indptr[row], indptr[row + 1]
+        vector = dict(zip(indices[start:end], data[start:end]))
+        terms = sorted(vector, key=df.__getitem__)
+        terms = [
+            term for number, term in enumerate(terms)
+            if number == 0 or df[term] <= max_count
+        ]
+        candidates = set()
+        for term in terms:
+            column = column_by_id[term]
+            candidates.update(column_rows[
+                column_indptr[column]:column_indptr[column + 1]
+            ])
+        candidates.discard(row)
+        scores = {}
+        for candidate in candidates:
+            first, last = indptr[candidate], indptr[candidate + 1]
+            scores[recipe_ids[candidate]] = sum(
+                data[position] * vector.get(indices[position], 0.0)
+                for position in range(first, last)
+            )
+        neighbours = top_k(scores, k)
+        neighbours += [(0, 0.0)] * (k - len(neighbours))
+        neighbour_ids.extend(pk for pk, _ in neighbours)
+        neighbour_scores.extend(score for _, score in neighbours)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(HEADER.pack(
+            MAGIC, total, len(ingredient_ids), len(indices), k
+        ))
+        for part in (recipe_ids, indptr, indices, data, ingredient_ids, idf,
+                     column_indptr, column_rows, neighbour_ids,
+                     neighbour_scores):
+            part.tofile(file)
+    os.replace(temporary_path, path)
+    truncate_log(log_path, log_size)
+
+    return {
+        'recipes': total,
+        'ingredients': len(ingredient_ids),
+        'size': os.path.getsize(path),
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+def truncate_log(log_path, size):
+    """Удаляет из журнала первые size байт, учтённые в новом снимке."""
+    if not size:
+        return
+    with lock_log(log_path, 'rb+') as file:
+        file.seek(size)
+        rest = file.read()
+        temporary_path = f'{log_path}.tmp'
+        with open(temporary_path, 'wb') as temporary:
+            temporary.write(rest)
+        os.replace(temporary_path, log_path)
@@ -0,0 +1,306 @@
+"""Модуль переноса рецептов в формате JSON Lines."""
+import base64
+import json
+import logging
+import mimetypes
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from api.images import delete_variants, render_variants
+from api.serializers.fields import Base64ImageField
+from recipes.constants import RECIPE_IMAGE_MAX_SIZE
+from recipes.models import Recipe, RecipeIngredient
+
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Количество рецептов в одной пачке при импорте и экспорте.
+TRANSFER_BATCH_SIZE = 1000
+
+
+class RecordError(ValueError):
+    """Ошибка в строке файла импорта."""
+
+
+class ParsedRecipe(NamedTuple):
+    """Проверенная запись файла импорта, готовая к сохранению."""
+
+    recipe: Recipe
+    created_at: Optional[datetime]
+    tag_ids: List[int]
+    ingredients: List[RecipeIngredient]
+    image: Optional[str]
+
+
+@contextmanager
+def worker_map(workers):
+    """
+    Возвращает функцию map, выполняющую задачи в пуле процессов.
+
+    При workers <= 1 задачи выполняются в текущем процессе. Соединения
+    с базой закрываются до запуска пула, чтобы дочерние процессы не
+    унаследовали открытые сокеты.
+    """
+    if workers <= 1:
+        yield map
+        return
+    connections.close_all()
+    with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+        yield lambda function, items: pool.map(
+            function, items, chunksize=max(len(items) // workers // 4, 1)
+        )
+
+
+def encode_image(name):
+    """
+    Читает изображение из хранилища и возвращает его как data URL.
+
+    Если файла нет в хранилище, рецепт экспортируется без изображения.
+    """
+    if not name:
+        return None
+    storage = Recipe._meta.get_field('image').storage
+    mime = mimetypes.guess_type(name)[0] or 'image/jpeg'
+    try:
+        with storage.open(name, 'rb') as file:
+            content = file.read()
+    except OSError:
+        logger.warning('Изображение %s не найдено', name)
+        return None
+    return f'data:{mime};base64,' + base64.b64encode(content).decode()
+
+
+def decode_image(data):
+    """
+    Сохраняет изображение из data URL и готовит его уменьшенные копии.
+
+    Выполняется в пуле процессов, поэтому не обращается к базе и не
+    бросает исключений: возвращает (имя файла, копии, текст ошибки).
+    """
+    field = Recipe._meta.get_field('image')
+    try:
+        file = Base64ImageField(
+            max_size=RECIPE_IMAGE_MAX_SIZE
+        ).to_internal_value(data)
+    except serializers.ValidationError as error:
+        return None, None, ' '.join(map(str, error.detail))
+    extension = os.path.splitext(file.name)[1]
+    name = field.storage.save(
+        field.generate_filename(None, f'{uuid.uuid4().hex}{extension}'),
+        file
+    )
+    try:
+        variants = render_variants(name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+        variants = {}
+    variants['source'] = name
+    return name, variants, None
+
+
+def delete_images(recipes):
+    """Удаляет сохранённые изображения рецептов, не попавших в базу."""
+    for recipe in recipes:
+        if recipe.image:
+            recipe.image.storage.delete(recipe.image.name)
+            delete_variants(recipe.image_variants)
+
+
+def recipe_to_record(recipe, image=None):
+    """Преобразует рецепт в словарь для строки JSON Lines."""
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'author': recipe.author.username,
+        'created_at': recipe.created_at.isoformat(),
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipeingredient_set.all()
+        ],
+        'image': image,
+    }
+
+
+def iter_export_batches(queryset, batch_size=TRANSFER_BATCH_SIZE):
+    """
+    Возвращает рецепты пачками по возрастанию id.
+
+    Каждая пачка загружается со связанными объектами за постоянное
+    число запросов, а следующая выбирается по последнему id без OFFSET.
+    """
+    queryset = queryset.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'recipeingredient_set',
+            RecipeIngredient.objects.select_related('ingredient')
+        )
+    ).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def load_record(line):
+    """Разбирает строку файла импорта в словарь."""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as error:
+        raise RecordError(f'Некорректный JSON: {error}.')
+    if not isinstance(record, dict):
+        raise RecordError('Ожидается объект JSON.')
+    return record
+
+
+def parse_author(record, authors, default_author_id=None):
+    """
+    Возвращает id автора записи.
+
+    Автор ищется по username среди существующих пользователей. Если его
+    нет или он не указан, используется default_author_id, а без него
+    запись отклоняется.
+    """
+    author = record.get('author')
+    if isinstance(author, str) and author in authors:
+        return authors[author]
+    if default_author_id is not None:
+        return default_author_id
+    if author is None:
+        raise RecordError(
+            'Не указан автор, задайте --default-author.'
+        )
+    raise RecordError(
+        f'Автор {author} не найден: создайте пользователя с таким '
+        f'username или задайте --default-author.'
+    )
+
+
+def parse_tags(tag_slugs, tags):
+    """Возвращает id тегов записи без повторов."""
+    missing = [slug for slug in tag_slugs if slug not in tags]
+    if missing:
+        raise RecordError(f'Теги не найдены: {", ".join(missing)}.')
+    return list(dict.fromkeys(tags[slug] for slug in tag_slugs))
+
+
+def parse_ingredients(amounts, ingredients):
+    """Возвращает несохранённые RecipeIngredient записи."""
+    if not amounts:
+        raise RecordError('Нужен хотя бы один ингредиент.')
+    recipe_ingredients = {}
+    for item in amounts:
+        if not isinstance(item, dict):
+            raise RecordError('Ингредиент должен быть объектом JSON.')
+        key = (item.get('name'), item.get('measurement_unit'))
+        if key not in ingredients:
+            raise RecordError('Ингредиент {} ({}) не найден.'.format(*key))
+        if ingredients[key] in recipe_ingredients:
+            raise RecordError('Ингредиент {} повторяется.'.format(key[0]))
+        recipe_ingredient = RecipeIngredient(
+            ingredient_id=ingredients[key], amount=item.get('amount')
+        )
+        try:
+            recipe_ingredient.clean_fields(exclude=['recipe', 'ingredient'])
+        except ValidationError as error:
+            raise RecordError(' '.join(error.messages))
+        recipe_ingredients[ingredients[key]] = recipe_ingredient
+    return list(recipe_ingredients.values())
+
+
+def parse_record(record, authors, tags, ingredients, default_author_id=None):
+    """
+    Проверяет запись файла импорта и готовит объекты для сохранения.
+
+    Авторы, теги и ингредиенты ищутся в переданных словарях, запросов к
+    базе нет. Рецепты авторов, которых нет в базе, получают автора
+    default_author_id, если он задан.
+    """
+    try:
+        recipe = Recipe(
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+        )
+        amounts = record['ingredients']
+    except KeyError as error:
+        raise RecordError(f'Нет обязательного поля {error}.')
+    tag_slugs = record.get('tags', [])
+    if not isinstance(tag_slugs, list) or not isinstance(amounts, list):
+        raise RecordError('Поля tags и ingredients должны быть списками.')
+
+    recipe.author_id = parse_author(record, authors, default_author_id)
+
+    created_at = record.get('created_at')
+    if created_at is not None:
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise RecordError('Некорректная дата created_at.')
+
+    try:
+        recipe.clean_fields(exclude=['author', 'image', 'shortcode'])
+    except ValidationError as error:
+        raise RecordError(' '.join(error.messages))
+
+    recipe_ingredients = parse_ingredients(amounts, ingredients)
+    recipe.ingredients_count = len(recipe_ingredients)
+    return ParsedRecipe(
+        recipe=recipe,
+        created_at=created_at,
+        tag_ids=parse_tags(tag_slugs, tags),
+        ingredients=recipe_ingredients,
+        image=record.get('image'),
+    )
+
+
+def get_authors(records):
+    """Возвращает id авторов пачки записей по username одним запросом."""
+    usernames = {
+        record['author'] for record in records
+        if isinstance(record.get('author'), str)
+    }
+    return dict(
+        User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'id')
+    )
+
+
+def bulk_create_recipes(recipes):
+    """
+    Создаёт рецепты одним запросом и проставляет им id.
+
+    Если СУБД не возвращает id из INSERT (SQLite), они выбираются
+    отдельным запросом: вызывается внутри транзакции, поэтому последние
+    id принадлежат только что созданным рецептам.
+    """
+    Recipe.objects.bulk_create(recipes)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return
+    ids = list(Recipe.objects.order_by('-id').values_list(
+        'id', flat=True
+    )[:len(recipes)])
+    for recipe, pk in zip(recipes, reversed(ids)):
+        recipe.pk = pk
@@ -1,7 +1,11 @@
 """Представления для приложения рецептов в приложении api."""
+import hashlib
+
 from django.db import models
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -13,23 +17,42 @@ from rest_framework.response import Response
 
 from ..serializers import (
     IngredientSerializer,
+    RecipeBulkSerializer,
     RecipeCreateSerializer,
     RecipeReadingSerializer,
     RecipeShortResponseSerializer,
+    ShoppingListIngredientSerializer,
     ShortLinkSerializer,
     TagSerializer
 )
+from ..cache import ReferenceCacheMixin, get_reference_version
+from ..exporters import SHOPPING_LIST_EXPORTERS
 from ..permissions import IsAuthorOrReadOnly
-from ..filters import IngredientFilter, RecipeFilter
+from ..similarity import get_similar_recipe_ids
+from ..filters import IngredientFilter, RecipeFilter, get_recipe_keyset
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
-    RecipeIngredient,
     ShoppingList,
+    ShoppingListItem,
     Tag
 )
-from ..pagination import LimitPageNumberPagination
+from ..pagination import (
+    KeysetPagination,
+    LimitPageNumberPagination,
+    get_paginator
+)
+from recipes.constants import SIMILAR_RECIPES_COUNT, SIMILAR_RECIPES_LIMIT
+from recipes.units import humanize_rows
+from users.models import Subscription
+
+
+# Модели и названия списков для action_type в адресе запроса.
+USER_RECIPE_LISTS = {
+    'shopping_cart': (ShoppingList, 'списке покупок'),
+    'favorite': (Favorite, 'избранном'),
+}
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -48,9 +71,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeCreateSerializer
         return RecipeReadingSerializer
 
+    @property
+    def paginator(self):
+        """
+        Включает пагинацию по ключу, если передан параметр cursor.
+
+        Лента подписок всегда листается по ключу (created_at, id).
+        """
+        if not hasattr(self, '_paginator'):
+            if self.action == 'feed':
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = get_paginator(
+                    self.request, get_recipe_keyset(self.request)
+                )
+        return self._paginator
+
     def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'feed', 'similar'):
+            return Recipe.objects.for_read(self.request.user)
         return Recipe.objects.with_user_annotations(self.request.user)
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """
+        Возвращает ленту рецептов авторов, на которых подписан пользователь.
+
+        Рецепты всех авторов выбираются одним запросом с условием
+        author_id IN (подзапрос подписок) и сортировкой по created_at,
+        страницы листаются по ключу без OFFSET.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            author_id__in=Subscription.objects.filter(
+                user=request.user
+            ).values('author_id')
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk):
+        """
+        Возвращает рецепты, похожие на данный по набору ингредиентов.
+
+        Список id берётся из индекса похожести без обращения к базе,
+        рецепты выбираются одним запросом и отдаются в порядке индекса.
+        Количество задаётся параметром limit.
+        """
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        try:
+            limit = int(request.query_params.get(
+                'limit', SIMILAR_RECIPES_LIMIT
+            ))
+        except ValueError:
+            limit = SIMILAR_RECIPES_LIMIT
+        recipe_ids = get_similar_recipe_ids(
+            recipe.id, max(1, min(limit, SIMILAR_RECIPES_COUNT))
+        )
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=['get'],
@@ -62,7 +150,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe = Recipe.objects.get(pk=pk)
             domain = request.get_host()
             protocol = 'https' if request.is_secure() else 'http'
-            link = f'{protocol}://{domain}/s/{recipe.shortcode}'
+            link = f'{protocol}://{domain}/s/{recipe.get_shortcode()}'
             serializer = ShortLinkSerializer({'short_link': link})
             return Response(serializer.data)
         except Recipe.DoesNotExist:
@@ -78,35 +166,102 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='download_shopping_cart'
     )
     def download_shopping_list(self, request):
-        """Обрабатывает GET-запрос для скачивания списка покупок."""
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in_shopping_lists__user=request.user
-            ).values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-            ).annotate(
-                total_amount=models.Sum('amount')
-            ).order_by('ingredient__name')
-        )
+        """
+        Обрабатывает GET-запрос для скачивания списка покупок.
 
-        shopping_list_txt = 'Список покупок:\n\n'
-        for ingredient in ingredients:
-            shopping_list_txt += (
-                f'• {ingredient["ingredient__name"]} - '
-                f'{ingredient["total_amount"]} '
-                f'{ingredient["ingredient__measurement_unit"]}\n'
+        Формат файла задаётся параметром file_format: txt, csv, json, pdf.
+        Количество одного продукта в граммах и килограммах, миллилитрах и
+        литрах складывается в одну строку. Если список покупок не
+        менялся, возвращается 304 по ETag.
+        """
+        exporter_class = SHOPPING_LIST_EXPORTERS.get(
+            request.query_params.get('file_format', 'txt')
+        )
+        if exporter_class is None:
+            return Response(
+                {'error': 'Неподдерживаемый формат файла'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        response = HttpResponse(
-            shopping_list_txt,
-            content_type='text/plain; charset=utf-8'
+        etag = self.get_shopping_list_etag(
+            request.user, exporter_class.extension
+        )
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        ingredients = humanize_rows(
+            ShoppingListItem.objects.filter(
+                user=request.user
+            ).summarize().iterator()
         )
-        response[
-            'Content-Disposition'] = 'attachment; filename="shopping_list.txt"'
+
+        exporter = exporter_class()
+        if exporter.streaming:
+            response = StreamingHttpResponse(
+                exporter.render(ingredients),
+                content_type=exporter.content_type
+            )
+        else:
+            response = HttpResponse(
+                b''.join(exporter.render(ingredients)),
+                content_type=exporter.content_type
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{exporter.extension}"'
+        )
+        response['ETag'] = etag
 
         return response
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/summary'
+    )
+    def shopping_cart_summary(self, request):
+        """
+        Возвращает сводный список покупок в JSON.
+
+        Количество ингредиентов уже просуммировано по рецептам из списка
+        покупок, поэтому ответ читает готовые строки пользователя. Один
+        продукт в разных единицах, например в граммах и килограммах,
+        даёт одну строку в удобной единице.
+        """
+        items = humanize_rows(
+            ShoppingListItem.objects.filter(user=request.user).summarize()
+        )
+        return Response({
+            'recipes_count': ShoppingList.objects.filter(
+                user=request.user
+            ).count(),
+            'ingredients': ShoppingListIngredientSerializer(
+                items, many=True
+            ).data,
+        })
+
+    @staticmethod
+    def get_shopping_list_etag(user, extension):
+        """
+        Вычисляет ETag по строкам списка покупок пользователя.
+
+        В ETag входит версия справочника ингредиентов: переименование
+        ингредиента или смена единицы измерения меняет файл, хотя сам
+        список покупок остаётся прежним.
+        """
+        state = ShoppingList.objects.filter(user=user).aggregate(
+            count=models.Count('id'),
+            recipes_sum=models.Sum('recipe_id'),
+            last_added=models.Max('created_at'),
+            last_updated=models.Max('recipe__updated_at'),
+        )
+        state['ingredients'] = get_reference_version('ingredients')
+        digest = hashlib.md5(
+            f'{extension}:{sorted(state.items())}'.encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -119,53 +274,81 @@ class RecipeViewSet(viewsets.ModelViewSet):
             pk=None,
             action_type=None
     ):
-        """Обрабатывает запросы для списка покупок и избранными рецептами."""
-        recipe = self.get_object()
-        user = request.user
-        serializer_class = RecipeShortResponseSerializer
-
-        if action_type == 'shopping_cart':
-            model_class = ShoppingList
-            message = 'списке покупок'
-        elif action_type == 'favorite':
-            model_class = Favorite
-            message = 'избранном'
-        else:
-            return Response({'error': 'Неверный запрос'},
-                            status=status.HTTP_400_BAD_REQUEST)
+        """
+        Обрабатывает запросы для списка покупок и избранными рецептами.
+
+        Добавление и удаление выполняются одним запросом INSERT ...
+        ON CONFLICT DO NOTHING RETURNING или DELETE ... RETURNING, рецепт
+        проверяется отдельно только если ничего не изменилось.
+        """
+        model_class, message = USER_RECIPE_LISTS[action_type]
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
 
         if request.method == 'POST':
-            obj, created = model_class.objects.get_or_create(
-                user=user,
-                recipe=recipe
-            )
-            if created:
-                serializer = serializer_class(
-                    recipe,
-                    context={'request': request}
-                )
+            if not model_class.objects.add_recipes(request.user, [recipe_id]):
+                get_object_or_404(Recipe.objects.only('id'), pk=recipe_id)
                 return Response(
-                    serializer.data,
-                    status=status.HTTP_201_CREATED
+                    {'error': f'Рецепт уже в {message}'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            return Response(
-                {'error': f'Рецепт уже в {message}'},
-                status=status.HTTP_400_BAD_REQUEST
+            serializer = RecipeShortResponseSerializer(
+                Recipe.objects.get(pk=recipe_id),
+                context={'request': request}
             )
-        elif request.method == 'DELETE':
-            obj = get_object_or_404(
-                model_class,
-                user=request.user,
-                recipe=recipe
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if not model_class.objects.remove_recipes(request.user, [recipe_id]):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='(?P<action_type>shopping_cart|favorite)'
+    )
+    def bulk_manage_shopping_list_and_favorite_recipes(
+            self,
+            request,
+            action_type=None
+    ):
+        """
+        Добавляет или убирает сразу несколько рецептов.
+
+        Тело запроса: {"recipes": [id, ...]}. POST возвращает
+        добавленные рецепты, уже добавленные ранее пропускаются.
+        """
+        model_class, _ = USER_RECIPE_LISTS[action_type]
+        serializer = RecipeBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+
+        if request.method == 'POST':
+            added = set(model_class.objects.add_recipes(
+                request.user, [recipe.id for recipe in recipes]
+            ))
+            response_serializer = RecipeShortResponseSerializer(
+                [recipe for recipe in recipes if recipe.id in added],
+                many=True,
+                context={'request': request}
             )
-            deleted_count, _ = obj.delete()
-            if deleted_count:
-                return Response(status=status.HTTP_204_NO_CONTENT)
+            return Response(
+                response_serializer.data, status=status.HTTP_201_CREATED
+            )
+
+        model_class.objects.remove_recipes(
+            request.user, [recipe.id for recipe in recipes]
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Представление для ингредиентов."""
 
+    cache_prefix = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
@@ -173,9 +356,10 @@ class IngredientViewSet(viewsets.ModelViewSet):
     http_method_names = ['get']
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Представление для тегов."""
 
+    cache_prefix = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     http_method_names = ['get']
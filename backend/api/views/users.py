@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db.models import F
 from djoser.views import UserViewSet as DjoserUserViewSet
 from django.shortcuts import get_object_or_404
 from rest_framework import status
@@ -9,9 +10,11 @@ from rest_framework.permissions import IsAuthenticated
 from ..serializers import (
     AvatarUpdateSerializer,
     UserDetailSerializer,
-    SubscriptionsSerializer
+    SubscriptionsSerializer,
+    get_recipes_limit
 )
-from ..pagination import LimitPageNumberPagination
+from ..pagination import LimitPageNumberPagination, get_paginator
+from recipes.models import Recipe
 from users.models import Subscription
 
 
@@ -22,7 +25,7 @@ class UserViewSet(DjoserUserViewSet):
     pagination_class = LimitPageNumberPagination
 
     def get_queryset(self):
-        return User.objects.all()
+        return User.objects.with_subscription(self.request.user)
 
     @action(
         detail=False,
@@ -84,24 +87,30 @@ class UserViewSet(DjoserUserViewSet):
     def subscriptions(self, request):
         subscriptions = User.objects.filter(
             subscribers__user=request.user
-        )
+        ).with_subscription(
+            request.user
+        ).annotate(
+            subscribed_at=F('subscribers__created_at')
+        ).order_by('username')
 
-        paginator = LimitPageNumberPagination()
+        paginator = get_paginator(request, ('subscribed_at', 'id'))
         page = paginator.paginate_queryset(subscriptions, request)
+        authors = page if page is not None else list(subscriptions)
 
-        if page is not None:
-            serializer = SubscriptionsSerializer(
-                page,
-                many=True,
-                context={'request': request}
-            )
-            return paginator.get_paginated_response(serializer.data)
+        recipes_by_author = Recipe.objects.latest_for_authors(
+            (author.id for author in authors),
+            get_recipes_limit(request) or None
+        )
+        for author in authors:
+            author.latest_recipes = recipes_by_author[author.id]
 
         serializer = SubscriptionsSerializer(
-            subscriptions,
+            authors,
             many=True,
             context={'request': request}
         )
+        if page is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     @action(
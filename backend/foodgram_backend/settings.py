@@ -10,6 +10,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', get_random_secret_key())
 
+# Ключ перестановки для коротких ссылок на рецепты. Его смена меняет
+# коды рецептов без сохранённого shortcode.
+SHORT_CODE_KEY = os.getenv('SHORT_CODE_KEY', 'foodgram-short-links')
+
 DEBUG = os.getenv('DJANGO_DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.getenv(
@@ -64,17 +68,45 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
-DATABASES = {
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'django'),
+            'USER': os.getenv('POSTGRES_USER', 'django'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', 5432)
+        }
+    }
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('POSTGRES_DB', 'django'),
-        'USER': os.getenv('POSTGRES_USER', 'django'),
-        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
-        'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Кэш справочников тегов и ингредиентов. По умолчанию он локален для
+# процесса, для общего кэша между воркерами задайте CACHE_BACKEND.
+# Версия справочника хранится в базе и копируется в этот кэш. С
+# локальным кэшем копия живёт REFERENCE_CACHE_MAX_AGE секунд, поэтому
+# другие воркеры видят изменение справочника с той же задержкой, что и
+# браузеры.
+REFERENCE_CACHE_ALIAS = 'default'
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_CACHE_MAX_AGE = 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -120,6 +152,26 @@ STATIC_ROOT = '/backend_static/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Уменьшенные копии загруженных изображений: название и размер (px).
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (640, 640),
+}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+# Обрабатывать изображения в текущем потоке, а не в фоновом пуле.
+IMAGE_PROCESSING_SYNC = os.getenv('IMAGE_PROCESSING_SYNC', 'False') == 'True'
+
+# Файл индекса похожих рецептов, рядом хранится журнал изменений.
+RECIPE_SIMILARITY_PATH = os.getenv(
+    'RECIPE_SIMILARITY_PATH', str(BASE_DIR / 'similarity' / 'recipes.bin')
+)
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 
 AUTH_USER_MODEL = 'users.User'
 
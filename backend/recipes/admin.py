@@ -1,6 +1,5 @@
 """Модуль для админки приложения рецептов."""
 from django.contrib import admin
-from django.db.models import Count
 
 # from .constants import SHORT_TEXT_IN_ADMIN_LENGTH
 from .models import (
@@ -9,6 +8,7 @@ from .models import (
     Recipe,
     RecipeIngredient,
     ShoppingList,
+    ShoppingListItem,
     Tag
 )
 
@@ -37,6 +37,28 @@ class ShoppingListAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'recipe__name']
 
 
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """
+    Админка для модели ShoppingListItem.
+
+    Строки ведутся автоматически, поэтому доступны только для чтения.
+    """
+
+    list_display = (
+        'user',
+        'ingredient',
+        'amount'
+    )
+    search_fields = ['user__username', 'ingredient__name']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     """Админка для модели Ingredient."""
@@ -83,6 +105,7 @@ class RecipeAdmin(admin.ModelAdmin):
         # 'display_ingredients',
         # 'display_tags',
         'favorites_count',
+        'in_shopping_lists_count',
         'created_at',
         'updated_at',
     )
@@ -92,11 +115,11 @@ class RecipeAdmin(admin.ModelAdmin):
     exclude = ['ingredients']
 
     def get_queryset(self, request):
-        """Возвращает queryset с аннотацией favorites_count."""
+        """Возвращает queryset с ингредиентами и тегами."""
         return super().get_queryset(request).prefetch_related(
             'recipeingredient_set__ingredient',
             'tags'
-        ).annotate(favorites_count=Count('favorited_by'))
+        )
 
     # @admin.display(description='Ингредиенты')
     # def display_ingredients(self, obj):
@@ -114,11 +137,6 @@ class RecipeAdmin(admin.ModelAdmin):
     #     return ', '.join(
     #         tag.name for tag in obj.tags.all())
 
-    @admin.display(description='В избранном', ordering='favorites_count')
-    def favorites_count(self, obj):
-        """Возвращает количество добавлений в избранное."""
-        return obj.favorites_count
-
     # @admin.display(description='Описание')
     # def display_text(self, obj):
     #     """Усекает текст описания"""
@@ -8,6 +8,31 @@ RECIPE_NAME_MAX_LENGTH: int = 256
 COOKING_TIME_MIN_LENGTH: int = 1
 COOKING_TIME_MAX_LENGTH: int = 32767
 
+# Максимальный размер изображения рецепта в байтах.
+RECIPE_IMAGE_MAX_SIZE: int = 10 * 1024 * 1024
+
+# Период полураспада вклада добавления в избранное или список покупок
+# в рейтинг trending (сек).
+TRENDING_HALF_LIFE: int = 60 * 60 * 24 * 7
+
+# Точка отсчёта весов рейтинга trending (Unix time, 2025-01-01 UTC).
+# Веса растут от неё экспоненциально, float переполнится примерно через
+# 1000 периодов полураспада.
+TRENDING_EPOCH: int = 1735689600
+
+# Количество событий, учитываемых в рейтинге за одну транзакцию.
+TRENDING_BATCH_SIZE: int = 5000
+
+# Количество похожих рецептов, хранимых в индексе для каждого рецепта.
+SIMILAR_RECIPES_COUNT: int = 20
+
+# Количество похожих рецептов в ответе по умолчанию.
+SIMILAR_RECIPES_LIMIT: int = 10
+
+# Ингредиенты, которые есть в большей доле рецептов, не используются
+# для поиска кандидатов в похожие при полной сборке индекса.
+SIMILARITY_MAX_DF: float = 0.1
+
 
 # ИНГРЕДИЕНТЫ.
 # Максимальная длинна название ингредиента.
@@ -16,6 +41,33 @@ INGREDIENT_MAX_LENGTH: int = 128
 # Максимальная длинна единицы измерения.
 MEASUREMENT_UNIT_MAX_LENGTH: int = 64
 
+# Максимальное количество ингредиентов в ответе на поиск по названию.
+INGREDIENT_SEARCH_LIMIT: int = 50
+
+# Единицы измерения, которые переводятся друг в друга: единица ->
+# (базовая единица, количество базовых единиц в одной). Количество
+# суммируется в базовой единице и выводится в самой крупной единице,
+# в которой оно не меньше одной.
+MEASUREMENT_UNITS: dict = {
+    'мг': ('мг', 1),
+    'г': ('мг', 1000),
+    'кг': ('мг', 1000 * 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+
+# Знаков после запятой в количестве списка покупок.
+SHOPPING_LIST_AMOUNT_PRECISION: int = 2
+
+# Конфигурация полнотекстового поиска рецептов в PostgreSQL.
+RECIPE_SEARCH_CONFIG: str = 'russian'
+
+# Длинна фрагмента описания в результатах поиска рецептов (слов).
+RECIPE_SEARCH_SNIPPET_WORDS: int = 30
+
+# Длинна фрагмента описания в поиске без PostgreSQL (символов).
+RECIPE_SEARCH_SNIPPET_LENGTH: int = 200
+
 # Минимальная и максимальная соответственно длинна поля amount.
 AMOUNT_MIN_LENGTH: int = 1
 AMOUNT_MAX_LENGTH: int = 32767
@@ -33,11 +85,30 @@ ADMIN_ID: int = 1
 # Объектов на страницу.
 PAGINATION_PAGE_SIZE: int = 6
 
+# Максимальное количество объектов на страницу при пагинации по ключу.
+MAX_PAGE_SIZE: int = 100
+
+# Максимальное количество рецептов в одном запросе на массовое
+# добавление в избранное или список покупок и удаление из них.
+BULK_RECIPES_MAX_LENGTH: int = 500
+
 # Длинна кода для короткой ссылки.
 SHORT_CODE_LENGTH: int = 8
 
+# Длинна генерируемого кода. Она короче старых кодов из uuid4, поэтому
+# новые коды не пересекаются со старыми.
+SHORT_CODE_GENERATED_LENGTH: int = 7
+
+# Алфавит для кодирования короткого кода.
+SHORT_CODE_ALPHABET: str = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+
+# Время хранения в кэше id рецепта по короткому коду (сек).
+SHORT_LINK_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+# Время хранения в кэше отсутствия рецепта по короткому коду (сек).
+SHORT_LINK_NEGATIVE_CACHE_TIMEOUT: int = 60
+
 # Длинна текста описания в админке.
 SHORT_TEXT_IN_ADMIN_LENGTH: int = 50
-
-# Максимальное количество попыток сохранить короткий код при ошибке.
-MAXIMUM_NUMBER_ATTEMPTS: int = 10
@@ -0,0 +1,20 @@
+"""Модуль индексов моделей приложения recipes."""
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+
+class PortableGinIndex(GinIndex):
+    """
+    GIN-индекс, который в других СУБД создаётся обычным индексом.
+
+    Индекс объявлен в модели, поэтому о нём знают автодетектор и
+    sqlmigrate, а миграции по-прежнему применяются к SQLite для
+    разработки.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(
+                self, model, schema_editor, using=using, **kwargs
+            )
+        return super().create_sql(model, schema_editor, using, **kwargs)
@@ -0,0 +1,39 @@
+"""Модуль заполнения коротких кодов рецептов"""
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.shortcodes import encode_shortcode
+
+
+class Command(BaseCommand):
+    help = 'Заполняет shortcode у рецептов, где он не сохранён'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = Recipe.objects.filter(
+            shortcode__isnull=True
+        ).values_list('id', flat=True).iterator(chunk_size=batch_size)
+
+        updated = 0
+        batch = []
+        for recipe_id in recipe_ids:
+            batch.append(
+                Recipe(id=recipe_id, shortcode=encode_shortcode(recipe_id))
+            )
+            if len(batch) == batch_size:
+                updated += self.update_batch(batch)
+                batch = []
+        if batch:
+            updated += self.update_batch(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Заполнено коротких кодов: {updated}.')
+        )
+
+    def update_batch(self, batch):
+        """Сохраняет коды одной пачки рецептов."""
+        Recipe.objects.bulk_update(batch, ['shortcode'])
+        return len(batch)
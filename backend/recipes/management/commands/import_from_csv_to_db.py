@@ -1,61 +1,296 @@
 """Модуль импорта данных из csv в базу данных"""
-import os
 import csv
+import io
+import json
+import os
+import time
+from collections import defaultdict
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Ingredient, ReferenceVersion, Tag
+
+
+# Количество строк файла в одной пачке по умолчанию.
+IMPORT_BATCH_SIZE = 1000
+
+# Размер части JSON-файла, читаемой за один раз.
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Поля строк файлов для каждого справочника.
+INGREDIENT_FIELDS = ('name', 'measurement_unit')
+TAG_FIELDS = ('name', 'slug')
+
+
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Возвращает элементы JSON-массива по одному, читая файл частями.
+
+    Пустой файл считается пустым массивом.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer:
+        return
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается массив JSON.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('Некорректный JSON.')
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
 
-from recipes.models import Ingredient, Tag
+
+def read_rows(path, fields):
+    """Возвращает строки csv или json файла как словари с полями fields."""
+    with open(path, encoding='utf-8') as file:
+        if path.endswith('.json'):
+            for item in iter_json_array(file):
+                try:
+                    yield {field: item[field] for field in fields}
+                except (KeyError, TypeError):
+                    raise CommandError(f'Некорректная запись: {item}.')
+        else:
+            for row in csv.reader(file):
+                if row:
+                    yield dict(zip(fields, row))
 
 
 class Command(BaseCommand):
     help = 'Импорт данных из CSV файлов'
 
-    def handle(self, *args, **kwargs):
-        self.import_ingredients()
-        self.import_tags()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Путь к csv или json файлу ингредиентов.'
+        )
+        parser.add_argument(
+            '--tags',
+            default=os.path.join(settings.BASE_DIR, 'data', 'tags.csv'),
+            help='Путь к csv или json файлу тегов.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help=('Обновлять название существующего тега с тем же slug. '
+                  'Ингредиенты уникальны по паре название-единица, '
+                  'поэтому существующие не меняются.')
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загружать пачки через COPY (только PostgreSQL).'
+        )
 
-    def import_ingredients(self):
-        """Импорт ингредиентов"""
-        BASE_DIR = settings.BASE_DIR
-        csv_path = os.path.join(BASE_DIR, 'data', 'ingredients.csv')
-        before_count = Ingredient.objects.count()
-        with open(csv_path, encoding='utf-8') as file:
-            reader = csv.reader(file)
-            Ingredient.objects.bulk_create(
-                [
-                    Ingredient(
-                        name=row[0],
-                        measurement_unit=row[1]
-                    ) for row in reader
-                ], ignore_conflicts=True
-            )
-            after_count = Ingredient.objects.count()
-            imported_data = after_count - before_count
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL.')
+        self.batch_size = options['batch_size']
+        self.upsert = options['upsert']
+        self.copy = options['copy']
+        self.import_ingredients(options['ingredients'])
+        self.import_tags(options['tags'])
+        # Пачки сохраняются без сигналов, поэтому кэши справочников
+        # сбрасываются здесь.
+        ReferenceVersion.objects.bump('ingredients')
+        ReferenceVersion.objects.bump('tags')
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Импортированно: {imported_data} записей ингридиентов.')
+    def import_ingredients(self, path):
+        """Импорт ингредиентов"""
+        save = self.copy_ingredients if self.copy else self.save_ingredients
+        self.import_file(
+            'ингридиентов', read_rows(path, INGREDIENT_FIELDS), save
         )
 
-    def import_tags(self):
+    def import_tags(self, path):
         """Импорт тегов"""
-        BASE_DIR = settings.BASE_DIR
-        csv_path = os.path.join(BASE_DIR, 'data', 'tags.csv')
-        before_count = Ingredient.objects.count()
-        with open(csv_path, encoding='utf-8') as file:
-            reader = csv.reader(file)
-            Tag.objects.bulk_create(
-                [
-                    Tag(
-                        name=row[0],
-                        slug=row[1]
-                    ) for row in reader
-                ], ignore_conflicts=True
+        save = self.copy_tags if self.copy else self.save_tags
+        self.import_file('тегов', read_rows(path, TAG_FIELDS), save)
+
+    def import_file(self, title, rows, save):
+        """Сохраняет строки пачками и выводит статистику по каждой."""
+        total = defaultdict(int)
+        started = time.perf_counter()
+        try:
+            for number, batch in enumerate(self.iter_batches(rows), 1):
+                batch_started = time.perf_counter()
+                with transaction.atomic():
+                    created, updated = save(batch)
+                elapsed = time.perf_counter() - batch_started
+                stats = {
+                    'rows': len(batch),
+                    'created': created,
+                    'updated': updated,
+                    'skipped': len(batch) - created - updated,
+                }
+                for key, value in stats.items():
+                    total[key] += value
+                self.stdout.write(
+                    self.format_stats(f'Пачка {number}', stats, elapsed)
+                )
+        except OSError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(self.format_stats(
+            f'Импортированно записей {title}',
+            total,
+            time.perf_counter() - started
+        )))
+
+    def iter_batches(self, rows):
+        """Разбивает поток строк на пачки по batch_size."""
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def format_stats(self, title, stats, elapsed):
+        """Возвращает строку статистики с пропускной способностью."""
+        rate = stats['rows'] / elapsed if elapsed else 0
+        return (
+            f'{title}: строк {stats["rows"]}, создано {stats["created"]}, '
+            f'обновлено {stats["updated"]}, без изменений {stats["skipped"]}, '
+            f'{elapsed:.2f} с, {rate:.0f} строк/с.'
+        )
+
+    def save_ingredients(self, batch):
+        """
+        Сохраняет пачку ингредиентов, возвращает (создано, обновлено).
+
+        Ингредиент уникален по паре название-единица: такое же название
+        с другой единицей добавляется как новый ингредиент.
+        """
+        existing = set(Ingredient.objects.filter(
+            name__in={row['name'] for row in batch}
+        ).values_list('name', 'measurement_unit'))
+
+        to_create = []
+        for row in batch:
+            key = (row['name'], row['measurement_unit'])
+            if key not in existing:
+                to_create.append(Ingredient(**row))
+                existing.add(key)
+
+        Ingredient.objects.bulk_create(to_create)
+        return len(to_create), 0
+
+    def save_tags(self, batch):
+        """
+        Сохраняет пачку тегов, возвращает (создано, обновлено).
+
+        Теги сопоставляются по slug. Тег, название которого уже занято
+        другим slug, пропускается.
+        """
+        tags = []
+        for row in batch:
+            tag = Tag(**row)
+            tag.clean()
+            tags.append(tag)
+        existing = {
+            tag.slug: tag for tag in Tag.objects.filter(
+                slug__in={tag.slug for tag in tags}
+            )
+        }
+        taken = dict(Tag.objects.filter(
+            name__in={tag.name for tag in tags}
+        ).values_list('name', 'slug'))
+
+        to_create = []
+        to_update = {}
+        for tag in tags:
+            if taken.get(tag.name, tag.slug) != tag.slug:
+                continue
+            current = existing.get(tag.slug)
+            if current is None:
+                to_create.append(tag)
+                existing[tag.slug] = tag
+            elif self.upsert and current.name != tag.name:
+                taken.pop(current.name, None)
+                current.name = tag.name
+                if current.pk is not None:
+                    to_update[current.pk] = current
+            else:
+                continue
+            taken[tag.name] = tag.slug
+
+        Tag.objects.bulk_create(to_create)
+        Tag.objects.bulk_update(to_update.values(), ['name'])
+        return len(to_create), len(to_update)
+
+    def copy_to_temporary_table(self, cursor, batch, fields):
+        """Загружает пачку во временную таблицу через COPY."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([row[field] for field in fields])
+        buffer.seek(0)
+        cursor.execute('DROP TABLE IF EXISTS import_batch')
+        cursor.execute(
+            'CREATE TEMPORARY TABLE import_batch ({}) ON COMMIT DROP'.format(
+                ', '.join(f'{field} text' for field in fields)
             )
-            after_count = Tag.objects.count()
-            imported_data = after_count - before_count
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Импортированно: {imported_data} записей тегов.')
         )
+        cursor.copy_expert(
+            'COPY import_batch ({}) FROM STDIN WITH (FORMAT csv)'.format(
+                ', '.join(fields)
+            ),
+            buffer
+        )
+
+    def copy_ingredients(self, batch):
+        """Сохраняет пачку ингредиентов через COPY и INSERT ... SELECT."""
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            self.copy_to_temporary_table(cursor, batch, INGREDIENT_FIELDS)
+            cursor.execute(f'''
+                INSERT INTO {table} (name, measurement_unit)
+                SELECT DISTINCT name, measurement_unit FROM import_batch
+                ON CONFLICT (name, measurement_unit) DO NOTHING
+            ''')
+            return cursor.rowcount, 0
+
+    def copy_tags(self, batch):
+        """Сохраняет пачку тегов через COPY и INSERT ... ON CONFLICT."""
+        for row in batch:
+            tag = Tag(**row)
+            tag.clean()
+            row['name'] = tag.name
+        table = connection.ops.quote_name(Tag._meta.db_table)
+        on_conflict = (
+            f'(slug) DO UPDATE SET name = EXCLUDED.name '
+            f'WHERE {table}.name <> EXCLUDED.name'
+            if self.upsert else 'DO NOTHING'
+        )
+        with connection.cursor() as cursor:
+            self.copy_to_temporary_table(cursor, batch, TAG_FIELDS)
+            cursor.execute(f'''
+                INSERT INTO {table} (name, slug)
+                SELECT DISTINCT ON (slug) name, slug FROM import_batch
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {table} AS tag
+                    WHERE tag.name = import_batch.name
+                      AND tag.slug <> import_batch.slug
+                )
+                ON CONFLICT {on_conflict}
+                RETURNING xmax = 0
+            ''')
+            inserted = [row[0] for row in cursor.fetchall()]
+        created = sum(inserted)
+        return created, len(inserted) - created
@@ -0,0 +1,38 @@
+"""Модуль пересборки сводных списков покупок"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from recipes.models import ShoppingListItem
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет сводные списки покупок со списками покупок и составом '
+        'рецептов и пересобирает расходящиеся'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество id пользователей в одном диапазоне.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed = 0
+        last_id = User.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        for start in range(0, last_id + 1, batch_size):
+            user_ids = list(User.objects.filter(
+                id__gte=start, id__lt=start + batch_size
+            ).values_list('id', flat=True))
+            if user_ids:
+                fixed += ShoppingListItem.objects.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводные списки покупок: исправлено строк {fixed}.'
+        ))
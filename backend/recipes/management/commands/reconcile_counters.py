@@ -0,0 +1,52 @@
+"""Модуль пересчёта денормализованных счётчиков"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from recipes.models import Recipe
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, списков покупок, ингредиентов, '
+        'рецептов и подписчиков и исправляет расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество id в одном диапазоне пересчёта.'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Recipe, User):
+            fixed = self.reconcile(model, options['batch_size'])
+            for field, count in fixed.items():
+                self.stdout.write(self.style.SUCCESS(
+                    f'{model._meta.verbose_name_plural}.{field}: '
+                    f'исправлено {count}.'
+                ))
+
+    def reconcile(self, model, batch_size):
+        """
+        Пересчитывает счётчики модели диапазонами id.
+
+        Каждый диапазон обновляется отдельной транзакцией, чтобы не
+        держать блокировки на всю таблицу.
+        """
+        fixed = {}
+        last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                result = model.objects.filter(
+                    id__gte=start, id__lt=start + batch_size
+                ).reconcile_counters()
+            for field, count in result.items():
+                fixed[field] = fixed.get(field, 0) + count
+        return fixed
@@ -0,0 +1,46 @@
+"""Модуль обновления рейтинга trending"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes.constants import TRENDING_BATCH_SIZE
+from recipes.scores import reset_trending_scores, update_trending_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Учитывает в рейтинге trending новые добавления в избранное и '
+        'списки покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=TRENDING_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рейтинг по всем событиям с нуля.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Повторять обновление каждые N секунд, 0 — один раз.'
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            reset_trending_scores()
+        while True:
+            started = time.perf_counter()
+            processed = update_trending_scores(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Учтено событий: {processed} за '
+                f'{time.perf_counter() - started:.2f} с.'
+            ))
+            if not options['interval']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
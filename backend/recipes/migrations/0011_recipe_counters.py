@@ -0,0 +1,45 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:32
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики рецептов по существующим данным."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for field, model_name in (
+        ('favorites_count', 'Favorite'),
+        ('in_shopping_lists_count', 'ShoppingList'),
+    ):
+        related = apps.get_model('recipes', model_name)
+        Recipe.objects.update(**{field: Coalesce(
+            models.Subquery(
+                related.objects.filter(
+                    recipe=models.OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    count=models.Count('*')
+                ).values('count')
+            ),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_shopping_lists_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
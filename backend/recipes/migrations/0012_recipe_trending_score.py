@@ -0,0 +1,44 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='scored',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Учтено в рейтинге'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Рейтинг популярности за последнее время'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='scored',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Учтено в рейтинге'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(condition=models.Q(('scored', False)), fields=['id'], name='favorite_unscored_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_favorites_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(condition=models.Q(('scored', False)), fields=['id'], name='shoppinglist_unscored_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:42
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    """
+    Заполняет поисковый вектор в PostgreSQL.
+
+    GIN-индекс по вектору создаётся миграцией 0018.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "UPDATE recipes_recipe SET search_vector = "
+        "setweight(to_tsvector('russian', name), 'A') || "
+        "setweight(to_tsvector('russian', text), 'B')"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_author_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            fill_search_vector, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceVersion',
+            fields=[
+                ('prefix', models.CharField(max_length=32, primary_key=True, serialize=False, verbose_name='Справочник')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'версия справочника',
+                'verbose_name_plural': 'Версии справочников',
+            },
+        ),
+    ]
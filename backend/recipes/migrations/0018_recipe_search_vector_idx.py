@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2026-10-18 02:24
+
+from django.db import migrations
+import recipes.indexes
+
+
+def drop_legacy_index(apps, schema_editor):
+    """Удаляет GIN-индекс, который раньше создавала миграция 0014."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipe_ingredients_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=recipes.indexes.PortableGinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(drop_legacy_index, migrations.RunPython.noop),
+    ]
@@ -4,7 +4,9 @@ from .recipe import Recipe
 from .recipe_ingredient import RecipeIngredient
 from .favorite import Favorite
 from .shopping_list import ShoppingList
+from .shopping_list_item import ShoppingListItem
 from .user_recipe_base import UserRecipeBase
+from .reference_version import ReferenceVersion
 
 __all__ = [
     'Tag',
@@ -13,5 +15,7 @@ __all__ = [
     'RecipeIngredient',
     'Favorite',
     'ShoppingList',
-    'UserRecipeBase'
+    'ShoppingListItem',
+    'UserRecipeBase',
+    'ReferenceVersion'
 ]
@@ -12,6 +12,8 @@ User = get_user_model()
 class Favorite(UserRecipeBase):
     """Модель избранного."""
 
+    recipe_counter = 'favorites_count'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -29,6 +31,13 @@ class Favorite(UserRecipeBase):
         verbose_name = 'избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='favorite_unscored_idx',
+                condition=models.Q(scored=False)
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 name='unique_user_recipe_favorite',
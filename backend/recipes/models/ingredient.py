@@ -2,6 +2,7 @@
 from django.db import models
 
 from ..constants import (INGREDIENT_MAX_LENGTH, MEASUREMENT_UNIT_MAX_LENGTH)
+from .managers import IngredientManager
 
 
 class Ingredient(models.Model):
@@ -15,6 +16,7 @@ class Ingredient(models.Model):
         max_length=MEASUREMENT_UNIT_MAX_LENGTH,
         verbose_name='Единица измерения'
     )
+    objects = IngredientManager()
 
     class Meta:
         verbose_name = 'ингредиент'
@@ -1,8 +1,31 @@
-"""Модуль менеджера модели Recipe"""
-from django.db import models
+"""Модуль менеджеров моделей Recipe и Ingredient"""
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector
+)
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, RowNumber, Substr
+from django.utils import timezone
 
+from ..constants import (
+    INGREDIENT_SEARCH_LIMIT,
+    RECIPE_SEARCH_CONFIG,
+    RECIPE_SEARCH_SNIPPET_LENGTH,
+    RECIPE_SEARCH_SNIPPET_WORDS
+)
+from ..units import get_base_amount, get_base_unit
+from users.managers import CounterQuerySetMixin, count_subquery
 
-class RecipeQuerySet(models.QuerySet):
+
+class RecipeQuerySet(CounterQuerySetMixin, models.QuerySet):
     """QuerySet для модели рецептов."""
 
     def with_user_annotations(self, user):
@@ -35,6 +58,143 @@ class RecipeQuerySet(models.QuerySet):
             )
         )
 
+    def for_read(self, user):
+        """
+        Готовит QuerySet для чтения рецептов.
+
+        Связанные автор, теги и ингредиенты загружаются пакетно, поэтому
+        количество запросов не зависит от размера страницы.
+        """
+        from .recipe_ingredient import RecipeIngredient
+        return self.with_user_annotations(user).prefetch_related(
+            'tags',
+            models.Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+            models.Prefetch(
+                'author',
+                queryset=get_user_model().objects.with_subscription(user)
+            ),
+        )
+
+    def latest_for_authors(self, author_ids, limit=None):
+        """
+        Возвращает словарь последних рецептов для каждого автора.
+
+        Рецепты всех авторов загружаются одним запросом, ограничение на
+        количество для каждого автора выполняется оконной функцией
+        ROW_NUMBER() OVER (PARTITION BY author_id).
+        """
+        author_ids = list(author_ids)
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        if not author_ids:
+            return recipes_by_author
+
+        queryset = self.filter(author_id__in=author_ids)
+        if limit is not None:
+            sql, params = queryset.order_by().annotate(
+                row_number=models.Window(
+                    expression=RowNumber(),
+                    partition_by=[models.F('author_id')],
+                    order_by=models.F('created_at').desc()
+                )
+            ).values('id', 'row_number').query.sql_with_params()
+            queryset = queryset.filter(id__in=RawSQL(
+                f'SELECT ranked.id FROM ({sql}) ranked '
+                f'WHERE ranked.row_number <= %s',
+                (*params, limit)
+            ))
+
+        for recipe in queryset.order_by('author_id', '-created_at'):
+            recipes_by_author[recipe.author_id].append(recipe)
+        return recipes_by_author
+
+    def search(self, text):
+        """
+        Ищет рецепты по названию и описанию.
+
+        В PostgreSQL используется столбец search_vector с GIN-индексом:
+        совпадения в названии весят больше, чем в описании, рецепты
+        аннотируются рангом search_rank и фрагментом описания
+        search_snippet с выделенными словами. На других СУБД каждое
+        слово ищется вхождением в название или описание.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            return self.search_by_words(text.split())
+        query = SearchQuery(
+            text, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return self.filter(search_vector=query).annotate(
+            # SearchRank возвращает real, а курсор пагинации хранит ранг как
+            # double precision: без приведения сравнение на границе
+            # страницы теряет или повторяет рецепты.
+            search_rank=Cast(
+                SearchRank(models.F('search_vector'), query),
+                models.FloatField()
+            ),
+            search_snippet=SearchHeadline(
+                'text',
+                query,
+                config=RECIPE_SEARCH_CONFIG,
+                start_sel='<mark>',
+                stop_sel='</mark>',
+                max_words=RECIPE_SEARCH_SNIPPET_WORDS
+            )
+        )
+
+    def search_by_words(self, words):
+        """Поиск без PostgreSQL: все слова должны встречаться в рецепте."""
+        condition = models.Q()
+        rank = models.Value(0.0)
+        for word in words:
+            condition &= (
+                models.Q(name__icontains=word)
+                | models.Q(text__icontains=word)
+            )
+            rank += models.Case(
+                models.When(name__icontains=word, then=models.Value(1.0)),
+                default=models.Value(0.5)
+            )
+        return self.filter(condition).annotate(
+            search_rank=models.ExpressionWrapper(
+                rank, output_field=models.FloatField()
+            ),
+            search_snippet=Substr('text', 1, RECIPE_SEARCH_SNIPPET_LENGTH)
+        )
+
+    def update_search_vector(self):
+        """Пересчитывает поисковый вектор рецептов в PostgreSQL."""
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=RECIPE_SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=RECIPE_SEARCH_CONFIG)
+        ))
+
+    def reconcile_counters(self):
+        """
+        Пересчитывает счётчики избранного, списков покупок и
+        ингредиентов.
+        """
+        from .favorite import Favorite
+        from .recipe_ingredient import RecipeIngredient
+        from .shopping_list import ShoppingList
+        return {
+            'favorites_count': self.reconcile_counter(
+                'favorites_count',
+                count_subquery(Favorite.objects.all(), 'recipe')
+            ),
+            'in_shopping_lists_count': self.reconcile_counter(
+                'in_shopping_lists_count',
+                count_subquery(ShoppingList.objects.all(), 'recipe')
+            ),
+            'ingredients_count': self.reconcile_counter(
+                'ingredients_count',
+                count_subquery(RecipeIngredient.objects.all(), 'recipe')
+            ),
+        }
+
 
 class RecipeManager(models.Manager):
     """Менеджер для модели рецептов"""
@@ -46,3 +206,378 @@ class RecipeManager(models.Manager):
     def with_user_annotations(self, user):
         """Возвращает queryset с аннотациями."""
         return self.get_queryset().with_user_annotations(user)
+
+    def for_read(self, user):
+        """Возвращает queryset для чтения рецептов."""
+        return self.get_queryset().for_read(user)
+
+    def latest_for_authors(self, author_ids, limit=None):
+        """Возвращает последние рецепты авторов."""
+        return self.get_queryset().latest_for_authors(author_ids, limit)
+
+    def search(self, text):
+        """Возвращает рецепты, найденные по названию и описанию."""
+        return self.get_queryset().search(text)
+
+    def reconcile_counters(self):
+        """Пересчитывает счётчики всех рецептов."""
+        return self.get_queryset().reconcile_counters()
+
+
+class ColumnsQuerySetMixin:
+    """Миксин для QuerySet с сырыми запросами к таблице модели."""
+
+    def get_columns(self, *names):
+        """Возвращает экранированные имена таблицы и столбцов модели."""
+        quote = connections[self.db].ops.quote_name
+        return [quote(self.model._meta.db_table)] + [
+            quote(self.model._meta.get_field(name).column) for name in names
+        ]
+
+
+class UserRecipeQuerySet(ColumnsQuerySetMixin, models.QuerySet):
+    """QuerySet для связей пользователя с рецептом."""
+
+    def add_recipes(self, user, recipe_ids):
+        """
+        Добавляет рецепты пользователю, возвращает id добавленных.
+
+        Вставка выполняется одним INSERT ... SELECT ... ON CONFLICT DO
+        NOTHING RETURNING: несуществующие и уже добавленные рецепты
+        пропускаются без предварительных запросов. Сигналы не
+        отправляются, поэтому счётчик рецептов меняется здесь же.
+        """
+        from .recipe import Recipe
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        if not recipe_ids:
+            return []
+        connection = connections[self.db]
+        table, user_column, recipe_column, created_column, scored_column = (
+            self.get_columns('user', 'recipe', 'created_at', 'scored')
+        )
+        recipes_table = connection.ops.quote_name(Recipe._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({user_column}, {recipe_column}, '
+                f'{created_column}, {scored_column}) '
+                f'SELECT %s, id, %s, %s FROM {recipes_table} '
+                f'WHERE id IN ({placeholders}) '
+                f'ON CONFLICT DO NOTHING RETURNING {recipe_column}',
+                [
+                    user.pk,
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                    False,
+                    *recipe_ids
+                ]
+            )
+            added = [row[0] for row in cursor.fetchall()]
+            Recipe.objects.filter(pk__in=added).add_to_counter(
+                self.model.recipe_counter, 1
+            )
+            self.model.recipes_added(user.pk, added)
+        return added
+
+    def remove_recipes(self, user, recipe_ids):
+        """
+        Убирает рецепты у пользователя, возвращает id убранных.
+
+        Строки удаляются одним DELETE ... RETURNING без загрузки
+        объектов. Счётчик и вклад в рейтинг trending меняются здесь же.
+        """
+        from .recipe import Recipe
+        from ..scores import subtract_trending_weights
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        if not recipe_ids:
+            return []
+        connection = connections[self.db]
+        table, user_column, recipe_column, created_column, scored_column = (
+            self.get_columns('user', 'recipe', 'created_at', 'scored')
+        )
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {user_column} = %s '
+                f'AND {recipe_column} IN ({placeholders}) '
+                f'RETURNING {recipe_column}, {scored_column}, '
+                f'{created_column}',
+                [user.pk, *recipe_ids]
+            )
+            rows = cursor.fetchall()
+            removed = [recipe_id for recipe_id, _, _ in rows]
+            Recipe.objects.filter(pk__in=removed).add_to_counter(
+                self.model.recipe_counter, -1
+            )
+            subtract_trending_weights(
+                (recipe_id, self.parse_created_at(created_at))
+                for recipe_id, scored, created_at in rows if scored
+            )
+            self.model.recipes_removed(user.pk, removed)
+        return removed
+
+    def parse_created_at(self, value):
+        """Приводит дату из сырого запроса к datetime с часовым поясом."""
+        value = self.model._meta.get_field('created_at').to_python(value)
+        if settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        return value
+
+
+class UserRecipeManager(models.Manager):
+    """Менеджер для избранного и списка покупок."""
+
+    def get_queryset(self):
+        """Возвращает UserRecipeQuerySet."""
+        return UserRecipeQuerySet(self.model, using=self._db)
+
+    def add_recipes(self, user, recipe_ids):
+        """Добавляет рецепты пользователю."""
+        return self.get_queryset().add_recipes(user, recipe_ids)
+
+    def remove_recipes(self, user, recipe_ids):
+        """Убирает рецепты у пользователя."""
+        return self.get_queryset().remove_recipes(user, recipe_ids)
+
+
+class ShoppingListItemQuerySet(ColumnsQuerySetMixin, models.QuerySet):
+    """QuerySet для сводного списка покупок."""
+
+    def apply_changes(self, select, params):
+        """
+        Прибавляет к строкам списка изменения количества.
+
+        select возвращает тройки (пользователь, ингредиент, изменение),
+        уникальные по паре пользователь-ингредиент. Изменения
+        применяются одним INSERT ... ON CONFLICT DO UPDATE, строки, у
+        которых количество перестало быть положительным, удаляются.
+        """
+        table, user_column, ingredient_column, amount_column = (
+            self.get_columns('user', 'ingredient', 'amount')
+        )
+        with transaction.atomic(using=self.db), \
+                connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({user_column}, {ingredient_column}, '
+                f'{amount_column}) {select} '
+                f'ON CONFLICT ({user_column}, {ingredient_column}) '
+                f'DO UPDATE SET {amount_column} = '
+                f'{table}.{amount_column} + EXCLUDED.{amount_column} '
+                f'RETURNING id, {amount_column}',
+                params
+            )
+            empty = [pk for pk, amount in cursor.fetchall() if amount <= 0]
+            if empty:
+                self.model.objects.filter(pk__in=empty).delete()
+
+    def add_recipes(self, user_id, recipe_ids, sign=1):
+        """Прибавляет ингредиенты рецептов к списку пользователя."""
+        from .recipe_ingredient import RecipeIngredient
+        if not recipe_ids:
+            return
+        quote = connections[self.db].ops.quote_name
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        self.apply_changes(
+            f'SELECT %s, ingredient_id, %s * SUM(amount) '
+            f'FROM {quote(RecipeIngredient._meta.db_table)} '
+            f'WHERE recipe_id IN ({placeholders}) GROUP BY ingredient_id',
+            [user_id, sign, *recipe_ids]
+        )
+
+    def remove_recipes(self, user_id, recipe_ids):
+        """Вычитает ингредиенты рецептов из списка пользователя."""
+        self.add_recipes(user_id, recipe_ids, sign=-1)
+
+    def change_recipe(self, recipe_id, changes):
+        """
+        Переносит изменение состава рецепта в списки покупок.
+
+        changes: {id ингредиента: изменение количества}. Изменения
+        применяются сразу у всех пользователей с рецептом в списке
+        покупок одним запросом.
+        """
+        from .shopping_list import ShoppingList
+        changes = {pk: delta for pk, delta in changes.items() if delta}
+        if not changes:
+            return
+        quote = connections[self.db].ops.quote_name
+        values = ', '.join(['(%s, %s)'] * len(changes))
+        self.apply_changes(
+            f'SELECT cart.user_id, delta.column1, delta.column2 '
+            f'FROM {quote(ShoppingList._meta.db_table)} AS cart, '
+            f'(VALUES {values}) AS delta WHERE cart.recipe_id = %s',
+            [value for item in changes.items() for value in item]
+            + [recipe_id]
+        )
+
+    def subtract_recipe(self, recipe_id):
+        """
+        Вычитает ингредиенты рецепта из списков всех пользователей, у
+        которых он в покупках, одним запросом.
+        """
+        from .recipe_ingredient import RecipeIngredient
+        from .shopping_list import ShoppingList
+        quote = connections[self.db].ops.quote_name
+        self.apply_changes(
+            f'SELECT cart.user_id, item.ingredient_id, -item.amount '
+            f'FROM {quote(ShoppingList._meta.db_table)} AS cart '
+            f'JOIN {quote(RecipeIngredient._meta.db_table)} AS item '
+            f'ON item.recipe_id = cart.recipe_id WHERE cart.recipe_id = %s',
+            [recipe_id]
+        )
+
+    def summarize(self):
+        """
+        Суммирует строки по названию ингредиента и единице измерения.
+
+        Количество переводится в базовую единицу прямо в запросе, поэтому
+        один продукт в граммах и килограммах даёт одну строку.
+        """
+        return self.values(
+            name=models.F('ingredient__name'),
+            unit=get_base_unit('ingredient__measurement_unit')
+        ).annotate(
+            total_amount=models.Sum(
+                get_base_amount('amount', 'ingredient__measurement_unit'),
+                output_field=models.BigIntegerField()
+            )
+        ).order_by('name', 'unit')
+
+    def rebuild(self, user_ids):
+        """
+        Собирает списки пользователей заново из рецептов в покупках.
+
+        Возвращает количество строк, которые отличались от пересчёта.
+        """
+        from .recipe_ingredient import RecipeIngredient
+        with transaction.atomic(using=self.db):
+            current = set(self.filter(user_id__in=user_ids).values_list(
+                'user_id', 'ingredient_id', 'amount'
+            ))
+            actual = set(RecipeIngredient.objects.filter(
+                recipe__in_shopping_lists__user_id__in=user_ids
+            ).values_list(
+                'recipe__in_shopping_lists__user_id', 'ingredient_id'
+            ).annotate(total_amount=models.Sum('amount')).order_by())
+            if current == actual:
+                return 0
+            self.filter(user_id__in=user_ids).delete()
+            self.bulk_create([
+                self.model(user_id=user_id, ingredient_id=pk, amount=amount)
+                for user_id, pk, amount in actual
+            ])
+        return len(current ^ actual)
+
+
+class ShoppingListItemManager(models.Manager):
+    """Менеджер для сводного списка покупок."""
+
+    def get_queryset(self):
+        """Возвращает ShoppingListItemQuerySet."""
+        return ShoppingListItemQuerySet(self.model, using=self._db)
+
+    def add_recipes(self, user_id, recipe_ids):
+        """Прибавляет ингредиенты рецептов к списку пользователя."""
+        return self.get_queryset().add_recipes(user_id, recipe_ids)
+
+    def remove_recipes(self, user_id, recipe_ids):
+        """Вычитает ингредиенты рецептов из списка пользователя."""
+        return self.get_queryset().remove_recipes(user_id, recipe_ids)
+
+    def change_recipe(self, recipe_id, changes):
+        """Переносит изменение состава рецепта в списки покупок."""
+        return self.get_queryset().change_recipe(recipe_id, changes)
+
+    def subtract_recipe(self, recipe_id):
+        """Вычитает ингредиенты рецепта из списков всех пользователей."""
+        return self.get_queryset().subtract_recipe(recipe_id)
+
+    def summarize(self):
+        """Суммирует строки с переводом в базовые единицы."""
+        return self.get_queryset().summarize()
+
+    def rebuild(self, user_ids):
+        """Собирает списки пользователей заново."""
+        return self.get_queryset().rebuild(user_ids)
+
+
+class IngredientQuerySet(models.QuerySet):
+    """QuerySet для модели ингредиентов."""
+
+    def search(self, name, limit=INGREDIENT_SEARCH_LIMIT):
+        """
+        Ищет ингредиенты по вхождению строки в название.
+
+        Совпадения с начала названия идут первыми. На PostgreSQL оба условия
+        обслуживаются триграммным GIN-индексом по UPPER(name).
+        """
+        return self.filter(name__icontains=name).annotate(
+            is_prefix=models.Case(
+                models.When(name__istartswith=name, then=models.Value(0)),
+                default=models.Value(1),
+                output_field=models.IntegerField()
+            )
+        ).order_by('is_prefix', 'name')[:limit]
+
+
+class IngredientManager(models.Manager):
+    """Менеджер для модели ингредиентов."""
+
+    def get_queryset(self):
+        """Возвращает IngredientQuerySet для модели ингредиентов."""
+        return IngredientQuerySet(self.model, using=self._db)
+
+    def search(self, name, limit=INGREDIENT_SEARCH_LIMIT):
+        """Возвращает ингредиенты, найденные по названию."""
+        return self.get_queryset().search(name, limit)
+
+
+class ReferenceVersionManager(models.Manager):
+    """
+    Менеджер для версий справочников.
+
+    Строка в базе — источник истины, а копия версии хранится в кэше
+    REFERENCE_CACHE_ALIAS, поэтому обычный запрос к справочнику не
+    обращается к базе. Если кэш локален для процесса, копия живёт не
+    дольше REFERENCE_CACHE_MAX_AGE: за это время смену версии увидят все
+    воркеры.
+    """
+
+    def get_cache(self):
+        """Возвращает кэш справочников и время хранения версии в нём."""
+        cache = caches[settings.REFERENCE_CACHE_ALIAS]
+        if isinstance(cache, (LocMemCache, DummyCache)):
+            return cache, settings.REFERENCE_CACHE_MAX_AGE
+        return cache, settings.REFERENCE_CACHE_TIMEOUT
+
+    def get_version(self, prefix):
+        """Возвращает версию справочника из кэша или из базы."""
+        cache, timeout = self.get_cache()
+        key = f'reference:{prefix}:version'
+        version = cache.get(key)
+        if version is None:
+            version = self.filter(prefix=prefix).values_list(
+                'version', flat=True
+            ).first() or 0
+            cache.add(key, version, timeout)
+        return version
+
+    def bump(self, prefix):
+        """
+        Увеличивает версию справочника, создавая её при первом вызове.
+
+        Копия в кэше заменяется после фиксации транзакции, чтобы другой
+        процесс не закэшировал новую версию со старыми данными.
+        """
+        if not self.filter(prefix=prefix).update(
+            version=models.F('version') + 1
+        ):
+            self.get_or_create(prefix=prefix, defaults={'version': 1})
+        version = self.filter(prefix=prefix).values_list(
+            'version', flat=True
+        ).get()
+        cache, timeout = self.get_cache()
+        transaction.on_commit(
+            lambda: cache.set(f'reference:{prefix}:version', version, timeout),
+            using=self.db
+        )
+        return version
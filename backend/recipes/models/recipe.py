@@ -1,27 +1,28 @@
 """Модель Recipe"""
-import uuid
-
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from ..constants import (
     ADMIN_ID,
     COOKING_TIME_MAX_LENGTH,
     COOKING_TIME_MIN_LENGTH,
-    MAXIMUM_NUMBER_ATTEMPTS,
     RECIPE_NAME_MAX_LENGTH,
     SHORT_CODE_LENGTH
 )
+from ..indexes import PortableGinIndex
+from ..shortcodes import encode_shortcode
 from .managers import RecipeManager
 from .ingredient import Ingredient
 from .tag import Tag
+from users.managers import CounterModelMixin
 
 
 User = get_user_model()
 
 
-class Recipe(models.Model):
+class Recipe(CounterModelMixin, models.Model):
     """Модель рецептов."""
 
     tags = models.ManyToManyField(
@@ -51,6 +52,12 @@ class Recipe(models.Model):
         blank=True,
         verbose_name='Изображение'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (мин)',
@@ -59,6 +66,31 @@ class Recipe(models.Model):
             MaxValueValidator(COOKING_TIME_MAX_LENGTH)
         ]
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_shopping_lists_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    ingredients_count = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Ингредиентов'
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Рейтинг популярности за последнее время'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -70,24 +102,55 @@ class Recipe(models.Model):
         null=True,
     )
     objects = RecipeManager()
+    counter_fields = (
+        'favorites_count',
+        'in_shopping_lists_count',
+        'ingredients_count',
+        'trending_score',
+        'search_vector',
+    )
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_created_at_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='recipe_author_created_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_favorites_id_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_id_idx'
+            ),
+            PortableGinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        """Переопределяем метод save для генерации и добавления shortcode"""
-        max_attempts = MAXIMUM_NUMBER_ATTEMPTS
-        attempt = 0
-        while not self.shortcode and attempt < max_attempts:
-            attempt += 1
-            self.shortcode = str(uuid.uuid4())[:8]
-            if not Recipe.objects.filter(
-                    shortcode=self.shortcode
-            ).exists():
-                break
+        """Сохраняет shortcode, если первичный ключ уже известен."""
+        if not self.shortcode and self.pk is not None:
+            self.shortcode = encode_shortcode(self.pk)
         super().save(*args, **kwargs)
+
+    def get_shortcode(self):
+        """
+        Возвращает короткий код рецепта.
+
+        Код вычисляется из первичного ключа, поэтому доступен и у рецептов,
+        созданных без сохранения shortcode (например, через bulk_create).
+        """
+        return self.shortcode or encode_shortcode(self.pk)
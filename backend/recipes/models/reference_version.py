@@ -0,0 +1,31 @@
+from django.db import models
+
+from .managers import ReferenceVersionManager
+
+
+class ReferenceVersion(models.Model):
+    """
+    Модель версии справочника.
+
+    Версия хранится в базе, чтобы её смену сразу видели все процессы,
+    даже если кэш ответов у каждого свой.
+    """
+
+    prefix = models.CharField(
+        max_length=32,
+        primary_key=True,
+        verbose_name='Справочник'
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+
+    objects = ReferenceVersionManager()
+
+    class Meta:
+        verbose_name = 'версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.prefix}: {self.version}'
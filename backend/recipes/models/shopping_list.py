@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from .recipe import Recipe
+from .shopping_list_item import ShoppingListItem
 from .user_recipe_base import UserRecipeBase
 
 
@@ -11,6 +12,8 @@ User = get_user_model()
 class ShoppingList(UserRecipeBase):
     """Модель списка покупок."""
 
+    recipe_counter = 'in_shopping_lists_count'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -28,6 +31,13 @@ class ShoppingList(UserRecipeBase):
         verbose_name = 'список покупок'
         verbose_name_plural = 'Списки покупок'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='shoppinglist_unscored_idx',
+                condition=models.Q(scored=False)
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 name='unique_user_recipe_shopping_list',
@@ -37,3 +47,13 @@ class ShoppingList(UserRecipeBase):
 
     def __str__(self):
         return f'{self.recipe.name} в списке покупок у {self.user.username}.'
+
+    @classmethod
+    def recipes_added(cls, user_id, recipe_ids):
+        """Прибавляет ингредиенты рецептов к сводному списку покупок."""
+        ShoppingListItem.objects.add_recipes(user_id, recipe_ids)
+
+    @classmethod
+    def recipes_removed(cls, user_id, recipe_ids):
+        """Вычитает ингредиенты рецептов из сводного списка покупок."""
+        ShoppingListItem.objects.remove_recipes(user_id, recipe_ids)
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from .ingredient import Ingredient
+from .managers import ShoppingListItemManager
+
+
+User = get_user_model()
+
+
+class ShoppingListItem(models.Model):
+    """
+    Модель строки сводного списка покупок пользователя.
+
+    Хранит сумму количества ингредиента по всем рецептам из списка
+    покупок. Строки меняются вместе со списком покупок и составом
+    рецептов, поэтому выгрузка не суммирует ингредиенты заново.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    # Может временно уйти в ноль или ниже до удаления строки.
+    amount = models.IntegerField(verbose_name='Количество')
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'строка сводного списка покупок'
+        verbose_name_plural = 'Сводные списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_user_ingredient_shopping_list_item',
+                fields=['user', 'ingredient']
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient.name}: {self.amount} у {self.user.username}.'
@@ -1,11 +1,31 @@
 from django.db import models
 
+from .managers import UserRecipeManager
+
 
 class UserRecipeBase(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата добавления'
     )
+    scored = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Учтено в рейтинге'
+    )
+
+    # Счётчик рецепта, который отражает количество связей.
+    recipe_counter = None
+
+    objects = UserRecipeManager()
+
+    @classmethod
+    def recipes_added(cls, user_id, recipe_ids):
+        """Вызывается после добавления рецептов пользователю."""
+
+    @classmethod
+    def recipes_removed(cls, user_id, recipe_ids):
+        """Вызывается после удаления рецептов у пользователя."""
 
     class Meta:
         abstract = True
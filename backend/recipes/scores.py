@@ -0,0 +1,109 @@
+"""Модуль расчёта рейтинга trending для рецептов."""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from .constants import TRENDING_BATCH_SIZE, TRENDING_EPOCH, TRENDING_HALF_LIFE
+from .models import Favorite, Recipe, ShoppingList
+
+
+# События, из которых складывается рейтинг.
+SCORED_MODELS = (Favorite, ShoppingList)
+
+
+def get_trending_weight(created_at):
+    """
+    Возвращает вклад события в рейтинг trending.
+
+    Вместо затухания старых событий растёт вес новых: 2 ** (t / T),
+    где t отсчитывается от TRENDING_EPOCH. Порядок рецептов получается
+    тот же, что при затухании всех весов к текущему моменту, но
+    пересчитывать уже учтённые события не нужно.
+    """
+    return 2 ** (
+        (created_at.timestamp() - TRENDING_EPOCH) / TRENDING_HALF_LIFE
+    )
+
+
+def weight_case(weights):
+    """Возвращает выражение CASE id WHEN ... со значениями весов."""
+    return Case(
+        *(When(pk=pk, then=Value(weight)) for pk, weight in weights.items()),
+        output_field=FloatField()
+    )
+
+
+def score_new_events(model, batch_size=TRENDING_BATCH_SIZE):
+    """
+    Учитывает в рейтинге одну пачку ещё не учтённых событий модели.
+
+    Веса прибавляются одним UPDATE, события помечаются учтёнными в той
+    же транзакции, поэтому каждое учитывается ровно один раз.
+    Возвращает количество обработанных событий.
+    """
+    with transaction.atomic():
+        events = list(
+            model.objects.filter(scored=False).select_for_update(
+                skip_locked=True
+            ).order_by('id').values_list('id', 'recipe_id', 'created_at')[
+                :batch_size
+            ]
+        )
+        if not events:
+            return 0
+        weights = defaultdict(float)
+        for _, recipe_id, created_at in events:
+            weights[recipe_id] += get_trending_weight(created_at)
+        Recipe.objects.filter(pk__in=weights).update(
+            trending_score=F('trending_score') + weight_case(weights)
+        )
+        model.objects.filter(
+            pk__in=[event_id for event_id, _, _ in events]
+        ).update(scored=True)
+    return len(events)
+
+
+def update_trending_scores(batch_size=TRENDING_BATCH_SIZE):
+    """Учитывает все новые события, возвращает их количество."""
+    processed = 0
+    for model in SCORED_MODELS:
+        while True:
+            count = score_new_events(model, batch_size)
+            processed += count
+            if count < batch_size:
+                break
+    return processed
+
+
+def reset_trending_scores():
+    """Обнуляет рейтинг, чтобы следующий расчёт учёл все события заново."""
+    with transaction.atomic():
+        Recipe.objects.exclude(trending_score=0).update(trending_score=0)
+        for model in SCORED_MODELS:
+            model.objects.filter(scored=True).update(scored=False)
+
+
+def subtract_trending_weight(instance):
+    """Вычитает из рейтинга вклад удалённого учтённого события."""
+    if instance.scored:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            trending_score=F('trending_score')
+            - get_trending_weight(instance.created_at)
+        )
+
+
+def subtract_trending_weights(events):
+    """
+    Вычитает из рейтинга вклад удалённых учтённых событий.
+
+    events — пары (id рецепта, дата события), вычитание выполняется
+    одним UPDATE.
+    """
+    weights = defaultdict(float)
+    for recipe_id, created_at in events:
+        weights[recipe_id] += get_trending_weight(created_at)
+    if weights:
+        Recipe.objects.filter(pk__in=weights).update(
+            trending_score=F('trending_score') - weight_case(weights)
+        )
@@ -0,0 +1,65 @@
+"""Модуль генерации коротких кодов рецептов."""
+import hashlib
+
+from django.conf import settings
+
+from .constants import SHORT_CODE_ALPHABET, SHORT_CODE_GENERATED_LENGTH
+
+
+# Разрядность половины блока перестановки Фейстеля, весь блок — 40 бит.
+HALF_BITS = 20
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+def _round(value, number):
+    """Раундовая функция перестановки, зависящая от ключа."""
+    digest = hashlib.blake2b(
+        f'{number}:{value}'.encode(),
+        key=settings.SHORT_CODE_KEY.encode()[:64],
+        digest_size=4
+    ).digest()
+    return int.from_bytes(digest, 'big') & HALF_MASK
+
+
+def _permute(value, rounds):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for number in rounds:
+        left, right = right, left ^ _round(right, number)
+    return (right << HALF_BITS) | left
+
+
+def encode_shortcode(pk):
+    """
+    Возвращает короткий код для первичного ключа рецепта.
+
+    Ключ переставляется обратимой перестановкой Фейстеля и кодируется в
+    base62, поэтому разные рецепты всегда получают разные коды и проверка
+    на совпадения в базе не нужна.
+    """
+    if not 0 <= pk < 1 << (HALF_BITS * 2):
+        raise ValueError(f'Слишком большой первичный ключ: {pk}')
+    value = _permute(pk, range(ROUNDS))
+    code = ''
+    for _ in range(SHORT_CODE_GENERATED_LENGTH):
+        value, index = divmod(value, len(SHORT_CODE_ALPHABET))
+        code = SHORT_CODE_ALPHABET[index] + code
+    return code
+
+
+def decode_shortcode(code):
+    """Возвращает первичный ключ по короткому коду или None."""
+    if len(code) != SHORT_CODE_GENERATED_LENGTH:
+        return None
+    value = 0
+    for char in code:
+        index = SHORT_CODE_ALPHABET.find(char)
+        if index == -1:
+            return None
+        value = value * len(SHORT_CODE_ALPHABET) + index
+    if value >> (HALF_BITS * 2):
+        return None
+    left, right = value & HALF_MASK, value >> HALF_BITS
+    for number in reversed(range(ROUNDS)):
+        left, right = right ^ _round(left, number), left
+    return (left << HALF_BITS) | right
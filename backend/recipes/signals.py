@@ -0,0 +1,191 @@
+"""Модуль сигналов приложения recipes."""
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.dispatch import receiver
+
+from .constants import SHORT_LINK_CACHE_TIMEOUT
+from .models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    ShoppingListItem
+)
+from .scores import subtract_trending_weight
+from .shortcodes import encode_shortcode
+from .views import get_short_link_cache_key
+
+
+User = get_user_model()
+
+# Рецепты, удаляемые в текущем потоке. Их ингредиенты вычитаются из
+# списков покупок до каскада, и сигналы удаления строк каскада их
+# пропускают.
+deleting = threading.local()
+
+
+def get_deleting_recipe_ids():
+    """Возвращает id рецептов, удаляемых в текущем потоке."""
+    if not hasattr(deleting, 'recipe_ids'):
+        deleting.recipe_ids = set()
+    return deleting.recipe_ids
+
+
+@receiver(post_save, sender=Recipe)
+def cache_short_code(sender, instance, **kwargs):
+    """Кэширует короткий код рецепта, заменяя отрицательный результат."""
+    cache.set(
+        get_short_link_cache_key(instance.get_shortcode()),
+        instance.pk,
+        SHORT_LINK_CACHE_TIMEOUT
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_code(sender, instance, **kwargs):
+    """Удаляет короткие коды удалённого рецепта из кэша."""
+    cache.delete_many([
+        get_short_link_cache_key(instance.get_shortcode()),
+        get_short_link_cache_key(encode_shortcode(instance.pk)),
+    ])
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector(sender, instance, update_fields, **kwargs):
+    """Пересчитывает поисковый вектор после изменения названия или текста."""
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик рецептов автора."""
+    if created:
+        User.objects.filter(pk=instance.author_id).add_to_counter(
+            'recipes_count', 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшает счётчик рецептов автора."""
+    User.objects.filter(pk=instance.author_id).add_to_counter(
+        'recipes_count', -1
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    """Увеличивает счётчик избранного или списков покупок рецепта."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).add_to_counter(
+            sender.recipe_counter, 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """Уменьшает счётчик избранного или списков покупок рецепта."""
+    Recipe.objects.filter(pk=instance.recipe_id).add_to_counter(
+        sender.recipe_counter, -1
+    )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def forget_trending_weight(sender, instance, **kwargs):
+    """Убирает удалённое событие из рейтинга trending."""
+    subtract_trending_weight(instance)
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_to_shopping_list_items(sender, instance, created, **kwargs):
+    """Прибавляет ингредиенты рецепта к сводному списку покупок."""
+    if created:
+        sender.recipes_added(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShoppingList)
+def remove_from_shopping_list_items(sender, instance, **kwargs):
+    """Вычитает ингредиенты рецепта из сводного списка покупок."""
+    if instance.recipe_id not in get_deleting_recipe_ids():
+        sender.recipes_removed(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    """Запоминает ингредиент и количество строки до изменения."""
+    instance.previous = None
+    if instance.pk is not None:
+        instance.previous = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def add_recipe_ingredient_change(sender, instance, **kwargs):
+    """
+    Переносит добавление или изменение ингредиента рецепта в списки
+    покупок, например при правке рецепта в админке.
+    """
+    changes = {instance.ingredient_id: instance.amount}
+    previous = getattr(instance, 'previous', None)
+    if previous:
+        ingredient_id, amount = previous
+        changes[ingredient_id] = changes.get(ingredient_id, 0) - amount
+    ShoppingListItem.objects.change_recipe(instance.recipe_id, changes)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def increment_ingredients_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик ингредиентов рецепта."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).add_to_counter(
+            'ingredients_count', 1
+        )
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def decrement_ingredients_count(sender, instance, **kwargs):
+    """Уменьшает счётчик ингредиентов рецепта, если он не удаляется."""
+    if instance.recipe_id not in get_deleting_recipe_ids():
+        Recipe.objects.filter(pk=instance.recipe_id).add_to_counter(
+            'ingredients_count', -1
+        )
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def subtract_recipe_ingredient(sender, instance, **kwargs):
+    """Вычитает удалённый ингредиент рецепта из списков покупок."""
+    if instance.recipe_id not in get_deleting_recipe_ids():
+        ShoppingListItem.objects.change_recipe(
+            instance.recipe_id, {instance.ingredient_id: -instance.amount}
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def subtract_deleted_recipe(sender, instance, **kwargs):
+    """
+    Вычитает ингредиенты удаляемого рецепта из списков покупок.
+
+    Вычитание делается одним запросом, пока строки ингредиентов и
+    списков покупок ещё не удалены каскадом.
+    """
+    ShoppingListItem.objects.subtract_recipe(instance.pk)
+    get_deleting_recipe_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_deleted_recipe(sender, instance, **kwargs):
+    """Снимает отметку об удалении рецепта после каскада."""
+    get_deleting_recipe_ids().discard(instance.pk)
@@ -0,0 +1,87 @@
+"""Модуль перевода количества ингредиентов между единицами измерения."""
+from django.db.models import BigIntegerField, Case, CharField, F, Value, When
+from django.db.models.functions import Cast
+
+from .constants import MEASUREMENT_UNITS, SHOPPING_LIST_AMOUNT_PRECISION
+
+
+def get_base_unit(unit_field):
+    """Возвращает выражение базовой единицы для поля единицы измерения."""
+    return Case(
+        *(
+            When(**{unit_field: unit}, then=Value(base))
+            for unit, (base, _) in MEASUREMENT_UNITS.items()
+        ),
+        default=F(unit_field),
+        output_field=CharField()
+    )
+
+
+def get_base_factor(unit_field):
+    """
+    Возвращает выражение множителя перевода в базовую единицу.
+
+    Множитель приводится к bigint: количество в килограммах, переведённое
+    в миллиграммы, быстро выходит за пределы integer.
+    """
+    return Cast(
+        Case(
+            *(
+                When(**{unit_field: unit}, then=Value(factor))
+                for unit, (_, factor) in MEASUREMENT_UNITS.items()
+            ),
+            default=Value(1),
+            output_field=BigIntegerField()
+        ),
+        BigIntegerField()
+    )
+
+
+def get_base_amount(amount_field, unit_field):
+    """Возвращает выражение количества в базовой единице в bigint."""
+    return Cast(amount_field, BigIntegerField()) * get_base_factor(unit_field)
+
+
+def get_output_units():
+    """Возвращает {базовая единица: [(множитель, единица), ...]}."""
+    output_units = {}
+    for unit, (base, factor) in MEASUREMENT_UNITS.items():
+        output_units.setdefault(base, []).append((factor, unit))
+    for units in output_units.values():
+        units.sort(reverse=True)
+    return output_units
+
+
+OUTPUT_UNITS = get_output_units()
+
+
+def humanize_amount(amount, unit):
+    """
+    Переводит количество в базовой единице в самую крупную единицу,
+    в которой оно не меньше одной.
+
+    Возвращает пару (количество, единица). Количество целое, если
+    делится без остатка, иначе округлено до нескольких знаков.
+    """
+    for factor, output_unit in OUTPUT_UNITS.get(unit, ()):
+        if amount >= factor:
+            break
+    else:
+        return amount, unit
+    if amount % factor == 0:
+        return amount // factor, output_unit
+    return round(amount / factor, SHOPPING_LIST_AMOUNT_PRECISION), output_unit
+
+
+def humanize_rows(rows):
+    """Переводит количество строк списка покупок в удобные единицы."""
+    for row in rows:
+        # SUM(bigint) в PostgreSQL возвращает numeric.
+        amount, unit = humanize_amount(
+            int(row['total_amount']), row['unit']
+        )
+        yield {
+            'ingredient__name': row['name'],
+            'ingredient__measurement_unit': unit,
+            'total_amount': amount,
+        }
@@ -1,19 +1,54 @@
 """Представления для приложения рецептов."""
+from django.core.cache import cache
 from django.http import HttpResponseRedirect
-from rest_framework.views import APIView
+from django.views import View
 
+from .constants import (
+    SHORT_LINK_CACHE_TIMEOUT,
+    SHORT_LINK_NEGATIVE_CACHE_TIMEOUT
+)
 from .models import Recipe
+from .shortcodes import decode_shortcode
 
 
-class ShortLinkRedirectView(APIView):
+def get_short_link_cache_key(short_code):
+    """Возвращает ключ кэша для короткого кода."""
+    return f'shortlink:{short_code}'
+
+
+def resolve_short_code(short_code):
+    """
+    Возвращает id рецепта по короткому коду или None.
+
+    Вычисляемые коды декодируются в первичный ключ, старые коды ищутся
+    по полю shortcode. Результат кэшируется, неизвестные коды кэшируются
+    как 0 на более короткий срок, чтобы перебор кодов не доходил до базы.
+    """
+    key = get_short_link_cache_key(short_code)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        pk = decode_shortcode(short_code)
+        lookup = {'shortcode': short_code} if pk is None else {'pk': pk}
+        recipe_id = Recipe.objects.filter(
+            **lookup
+        ).values_list('id', flat=True).first()
+        if recipe_id is None:
+            cache.set(key, 0, SHORT_LINK_NEGATIVE_CACHE_TIMEOUT)
+        else:
+            cache.set(key, recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    return recipe_id or None
+
+
+class ShortLinkRedirectView(View):
     """Перенаправляет по короткой ссылке на рецепт."""
 
+    http_method_names = ['get', 'head']
+
     def get(self, request, short_code):
-        recipe = Recipe.objects.filter(shortcode=short_code).first()
-        if recipe is None:
+        recipe_id = resolve_short_code(short_code)
+        if recipe_id is None:
             return HttpResponseRedirect(
                 request.build_absolute_uri('/not-found'))
-        recipe_id = recipe.id
         return HttpResponseRedirect(
             request.build_absolute_uri(f'/recipes/{recipe_id}')
         )
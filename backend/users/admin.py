@@ -14,6 +14,8 @@ class UserAdmin(BaseUserAdmin):
         'username',
         'display_full_name',
         'avatar',
+        'recipes_count',
+        'subscribers_count',
     )
     search_fields = ['email', 'username']
 
@@ -11,3 +11,6 @@ FIRST_NAME_MAX_LENGTH: int = 150
 
 # Максимальная длина фамилии пользователя.
 LAST_NAME_MAX_LENGTH: int = 150
+
+# Максимальный размер аватара в байтах.
+AVATAR_MAX_SIZE: int = 5 * 1024 * 1024
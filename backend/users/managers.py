@@ -0,0 +1,125 @@
+"""Модуль менеджера модели User"""
+from django.contrib.auth.models import UserManager as DjangoUserManager
+from django.db import models
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    """
+    Возвращает подзапрос количества строк queryset для внешней строки.
+
+    Строки связываются с внешним запросом по внешнему ключу field.
+    """
+    return Coalesce(
+        models.Subquery(
+            queryset.filter(
+                **{field: models.OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=models.Count('*')
+            ).values('count')
+        ),
+        0
+    )
+
+
+class CounterModelMixin:
+    """
+    Модель с денормализованными полями, которые меняются через F().
+
+    Сохранение существующей строки целиком не записывает поля из
+    counter_fields: иначе прочитанные ранее значения затёрли бы
+    изменения, сделанные конкурентными запросами.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        """Исключает counter_fields из UPDATE существующей строки."""
+        if not (
+            self._state.adding or args or kwargs.get('force_insert')
+            or kwargs.get('update_fields') is not None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class CounterQuerySetMixin:
+    """Изменение и пересчёт денормализованных счётчиков."""
+
+    def add_to_counter(self, field, delta):
+        """
+        Атомарно меняет счётчик на delta одним UPDATE с F().
+
+        Счётчик не опускается ниже нуля: строки, где он меньше -delta,
+        не меняются, их исправляет пересчёт.
+        """
+        queryset = self
+        if delta < 0:
+            queryset = self.filter(**{f'{field}__gte': -delta})
+        return queryset.update(**{field: models.F(field) + delta})
+
+    def reconcile_counter(self, field, actual):
+        """
+        Записывает в счётчик фактическое значение там, где они разошлись.
+
+        Возвращает количество исправленных строк.
+        """
+        return self.exclude(**{field: actual}).update(**{field: actual})
+
+
+class UserQuerySet(CounterQuerySetMixin, models.QuerySet):
+    """QuerySet для модели пользователей."""
+
+    def with_subscription(self, user):
+        """Аннотируем QuerySet подпиской текущего пользователя."""
+        from .models import Subscription
+        if user.is_authenticated:
+            return self.annotate(
+                is_subscribed=models.Exists(
+                    Subscription.objects.filter(
+                        user=user,
+                        author=models.OuterRef('id')
+                    )
+                )
+            )
+        return self.annotate(
+            is_subscribed=models.Value(
+                False,
+                output_field=models.BooleanField()
+            )
+        )
+
+    def reconcile_counters(self):
+        """Пересчитывает счётчики рецептов и подписчиков."""
+        from .models import Subscription
+        recipe_model = self.model._meta.get_field('recipes').related_model
+        return {
+            'recipes_count': self.reconcile_counter(
+                'recipes_count',
+                count_subquery(recipe_model.objects.all(), 'author')
+            ),
+            'subscribers_count': self.reconcile_counter(
+                'subscribers_count',
+                count_subquery(Subscription.objects.all(), 'author')
+            ),
+        }
+
+
+class UserManager(DjangoUserManager):
+    """Менеджер для модели пользователей."""
+
+    def get_queryset(self):
+        """Возвращает UserQuerySet для модели пользователей."""
+        return UserQuerySet(self.model, using=self._db)
+
+    def with_subscription(self, user):
+        """Возвращает queryset с аннотацией подписки."""
+        return self.get_queryset().with_subscription(user)
+
+    def reconcile_counters(self):
+        """Пересчитывает счётчики всех пользователей."""
+        return self.get_queryset().reconcile_counters()
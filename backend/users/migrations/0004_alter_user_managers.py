@@ -0,0 +1,20 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:14
+
+from django.db import migrations
+import users.managers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.managers.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='subscription_user_created_idx'),
+        ),
+    ]
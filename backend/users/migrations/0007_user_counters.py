@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-18 01:32
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики пользователей по существующим данным."""
+    User = apps.get_model('users', 'User')
+    for field, app_label, model_name in (
+        ('recipes_count', 'recipes', 'Recipe'),
+        ('subscribers_count', 'users', 'Subscription'),
+    ):
+        related = apps.get_model(app_label, model_name)
+        User.objects.update(**{field: Coalesce(
+            models.Subquery(
+                related.objects.filter(
+                    author=models.OuterRef('pk')
+                ).order_by().values('author').annotate(
+                    count=models.Count('*')
+                ).values('count')
+            ),
+            0
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_avatar_variants'),
+        ('recipes', '0011_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -7,10 +7,11 @@ from .constants import (
     LAST_NAME_MAX_LENGTH,
     USERNAME_MAX_LENGTH
 )
+from .managers import CounterModelMixin, UserManager
 from .validators import validate_username
 
 
-class User(AbstractUser):
+class User(CounterModelMixin, AbstractUser):
     """Кастомная модель пользователя."""
 
     email = models.EmailField(
@@ -38,8 +39,27 @@ class User(AbstractUser):
         null=True,
         verbose_name='Аватар'
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии аватара'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков'
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    counter_fields = ('recipes_count', 'subscribers_count')
+
+    objects = UserManager()
 
     class Meta:
         verbose_name = 'пользователь'
@@ -77,6 +97,12 @@ class Subscription(models.Model):
         verbose_name = 'подписка'
         verbose_name_plural = 'Подписки'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='subscription_user_created_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 name='unique_user_author',
@@ -0,0 +1,22 @@
+"""Модуль сигналов приложения users."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subscription, User
+
+
+@receiver(post_save, sender=Subscription)
+def increment_subscribers_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик подписчиков автора."""
+    if created:
+        User.objects.filter(pk=instance.author_id).add_to_counter(
+            'subscribers_count', 1
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_subscribers_count(sender, instance, **kwargs):
+    """Уменьшает счётчик подписчиков автора."""
+    User.objects.filter(pk=instance.author_id).add_to_counter(
+        'subscribers_count', -1
+    )